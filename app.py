@@ -13,174 +13,258 @@ if 'generated_tests' not in st.session_state:
 if 'generated_models' not in st.session_state:
     st.session_state.generated_models = {}
 
+# Precompiled patterns used by the generators
+_COL_RE = re.compile(r'column[s]?\s+(\w+)', re.IGNORECASE)
+_REF_RE = re.compile(r'(?:to|from|in)\s+(\w+)', re.IGNORECASE)
+_ROWS_RE = re.compile(r'(\d+)\s+rows?')
+_GT_RE = re.compile(r'greater than\s+(\d+)', re.IGNORECASE)
+_WHERE_RE = re.compile(r'where\s+(.+)', re.IGNORECASE)
+_JOIN_RE = re.compile(r'join\s+(\w+)', re.IGNORECASE)
+
+# Every keyword the Then-statement generators react to, scanned in one pass
+_THEN_KEYWORDS_RE = re.compile(
+    r'(?P<not_null>not null)|(?P<unique>unique)'
+    r'|(?P<relationship>relationship|references)'
+    r'|(?P<accepted_values>accepted_values|one of)'
+    r'|(?P<should_be>should be)|(?P<rows>rows)'
+    r'|(?P<greater_than>greater than)|(?P<no_duplicates>no duplicates)',
+    re.IGNORECASE
+)
+
+# CTE templates for generate_dbt_model
+_FILTERED_CTE_TMPL = """filtered_data as (
+    select *
+    from {source}
+    where {condition}
+),
+
+"""
+
+_AGGREGATED_CTE_TMPL = """aggregated_data as (
+    select
+        -- Add your grouping columns here
+        count(*) as record_count,
+        sum(amount) as total_amount
+    from {source}
+    group by 1
+),
+
+"""
+
+_JOINED_CTE_TMPL = """joined_data as (
+    select
+        a.*,
+        b.additional_field
+    from {source} a
+    left join {{{{ ref('{join_table}') }}}} b
+        on a.id = b.foreign_key
+),
+
+"""
+
+_FINAL_CTE_TMPL = """final as (
+    select
+        *,
+        current_timestamp as dbt_loaded_at
+    from {source}
+)
+
+select * from final
+"""
+
 # Helper Functions
+def _add_scenario(scenarios, text):
+    scenarios.append({
+        'name': text,
+        'given': [],
+        'when': [],
+        'then': []
+    })
+
+def _step_handler(step):
+    def handler(scenarios, text):
+        if scenarios:
+            scenarios[-1][step].append(text)
+    return handler
+
+def _add_and_step(scenarios, text):
+    # Add to the last category
+    if scenarios:
+        scenario = scenarios[-1]
+        for step in ('then', 'when', 'given'):
+            if scenario[step]:
+                scenario[step].append(text)
+                break
+
+# Leading Gherkin keyword -> handler(scenarios, text)
+_GHERKIN_HANDLERS = {
+    'Scenario:': _add_scenario,
+    'Given': _step_handler('given'),
+    'When': _step_handler('when'),
+    'Then': _step_handler('then'),
+    'And': _add_and_step,
+}
+
+# Keyword then text; no space is required after the keyword (e.g. "Scenario:Orders")
+_GHERKIN_LINE_RE = re.compile(r'^(Scenario:|Given|When|Then|And)\s*(.*)')
+
+@st.cache_data(show_spinner=False)
 def parse_gherkin(gherkin_text):
     """Parse Gherkin syntax into structured scenarios"""
     scenarios = []
-    current_scenario = None
     
-    lines = gherkin_text.strip().split('\n')
-    
-    for line in lines:
+    for line in gherkin_text.splitlines():
         line = line.strip()
         if not line or line.startswith('#'):
             continue
-            
-        if line.startswith('Feature:'):
-            feature_name = line.replace('Feature:', '').strip()
-            continue
-            
-        if line.startswith('Scenario:'):
-            if current_scenario:
-                scenarios.append(current_scenario)
-            current_scenario = {
-                'name': line.replace('Scenario:', '').strip(),
-                'given': [],
-                'when': [],
-                'then': []
-            }
-            
-        elif line.startswith('Given'):
-            if current_scenario:
-                current_scenario['given'].append(line.replace('Given', '').strip())
-                
-        elif line.startswith('And') and current_scenario:
-            # Add to the last category
-            if current_scenario['then']:
-                current_scenario['then'].append(line.replace('And', '').strip())
-            elif current_scenario['when']:
-                current_scenario['when'].append(line.replace('And', '').strip())
-            elif current_scenario['given']:
-                current_scenario['given'].append(line.replace('And', '').strip())
-                
-        elif line.startswith('When'):
-            if current_scenario:
-                current_scenario['when'].append(line.replace('When', '').strip())
-                
-        elif line.startswith('Then'):
-            if current_scenario:
-                current_scenario['then'].append(line.replace('Then', '').strip())
+        
+        match = _GHERKIN_LINE_RE.match(line)
+        if match:
+            _GHERKIN_HANDLERS[match.group(1)](scenarios, match.group(2))
     
-    if current_scenario:
-        scenarios.append(current_scenario)
+    # Joined once here rather than in every generator that quotes them
+    for scenario in scenarios:
+        scenario['given_joined'] = ' '.join(scenario['given'])
+        scenario['then_joined'] = ' '.join(scenario['then'])
     
     return scenarios
 
+def _scenario_key(scenario):
+    """Hashable form of a parsed scenario, used as the generator cache key"""
+    return (
+        scenario['name'],
+        tuple(scenario['given']),
+        tuple(scenario['when']),
+        tuple(scenario['then']),
+        scenario['given_joined'],
+        scenario['then_joined']
+    )
+
+# Memoize a scenario generator on the scenario contents and remaining arguments. Streamlit
+# re-executes this script on every rerun, so the cache has to live in st.cache_data to survive.
+_cached_generator = st.cache_data(show_spinner=False, max_entries=256, hash_funcs={dict: _scenario_key})
+
+def _then_keywords(then_stmt):
+    """Return the set of keyword groups present in a Then statement"""
+    return {m.lastgroup for m in _THEN_KEYWORDS_RE.finditer(then_stmt)}
+
+@_cached_generator
 def generate_dbt_schema_test(scenario, model_name):
     """Generate DBT schema.yml test configuration"""
-    test_name = scenario['name'].lower().replace(' ', '_')
+    if not scenario['then']:
+        return f"# Test: {scenario['name']}\n# No Then statements to generate schema tests from\n"
     
-    schema_yml = f"""# Test: {scenario['name']}
+    parts = [f"""# Test: {scenario['name']}
 version: 2
 
 models:
   - name: {model_name}
     description: "{scenario['name']}"
-    columns:"""
+    columns:"""]
     
     # Extract column tests from Then statements
     for then_stmt in scenario['then']:
-        if 'not null' in then_stmt.lower():
-            col_match = re.search(r'column[s]?\s+(\w+)', then_stmt, re.IGNORECASE)
-            if col_match:
-                col_name = col_match.group(1)
-                schema_yml += f"""
+        col_match = _COL_RE.search(then_stmt)
+        if not col_match:
+            continue
+        col_name = col_match.group(1)
+        keywords = _then_keywords(then_stmt)
+
+        if 'not_null' in keywords:
+            parts.append(f"""
       - name: {col_name}
         tests:
-          - not_null"""
+          - not_null""")
         
-        if 'unique' in then_stmt.lower():
-            col_match = re.search(r'column[s]?\s+(\w+)', then_stmt, re.IGNORECASE)
-            if col_match:
-                col_name = col_match.group(1)
-                schema_yml += f"""
+        if 'unique' in keywords:
+            parts.append(f"""
       - name: {col_name}
         tests:
-          - unique"""
+          - unique""")
         
-        if 'relationship' in then_stmt.lower() or 'references' in then_stmt.lower():
-            col_match = re.search(r'column[s]?\s+(\w+)', then_stmt, re.IGNORECASE)
-            ref_match = re.search(r'(?:to|from|in)\s+(\w+)', then_stmt, re.IGNORECASE)
-            if col_match and ref_match:
-                col_name = col_match.group(1)
+        if 'relationship' in keywords:
+            ref_match = _REF_RE.search(then_stmt)
+            if ref_match:
                 ref_table = ref_match.group(1)
-                schema_yml += f"""
+                parts.append(f"""
       - name: {col_name}
         tests:
           - relationships:
               to: ref('{ref_table}')
-              field: id"""
+              field: id""")
         
-        if 'accepted_values' in then_stmt.lower() or 'one of' in then_stmt.lower():
-            col_match = re.search(r'column[s]?\s+(\w+)', then_stmt, re.IGNORECASE)
-            values_match = re.findall(r"'([^']+)'", then_stmt)
-            if col_match:
-                col_name = col_match.group(1)
-                values_str = ', '.join([f"'{v}'" for v in values_match])
-                schema_yml += f"""
+        if 'accepted_values' in keywords:
+            # Quoted values sit at the odd indexes of a split on the quote
+            values_str = ', '.join([f"'{v}'" for v in then_stmt.split("'")[1::2] if v])
+            parts.append(f"""
       - name: {col_name}
         tests:
           - accepted_values:
-              values: [{values_str}]"""
+              values: [{values_str}]""")
     
-    return schema_yml
+    return ''.join(parts)
 
+@_cached_generator
 def generate_dbt_singular_test(scenario, model_name):
     """Generate DBT singular test (SQL file)"""
-    test_name = scenario['name'].lower().replace(' ', '_')
-    
-    sql_test = f"""-- Test: {scenario['name']}
--- Description: {' '.join(scenario['given'])}
+    header = f"""-- Test: {scenario['name']}
+-- Description: {scenario['given_joined']}
 
 """
+    if not scenario['then']:
+        return header
+    
+    parts = [header]
     
     # Build SELECT statement based on Then conditions
     conditions = []
     for then_stmt in scenario['then']:
-        if 'should be' in then_stmt.lower() and 'rows' in then_stmt.lower():
-            count_match = re.search(r'(\d+)\s+rows?', then_stmt)
+        keywords = _then_keywords(then_stmt)
+        if 'should_be' in keywords and 'rows' in keywords:
+            count_match = _ROWS_RE.search(then_stmt)
             if count_match:
                 expected_count = count_match.group(1)
-                sql_test += f"""-- Expecting {expected_count} rows
+                parts.append(f"""-- Expecting {expected_count} rows
 select
     count(*) as actual_count
 from {{{{ ref('{model_name}') }}}}
 having count(*) != {expected_count}
-"""
-        elif 'greater than' in then_stmt.lower():
-            col_match = re.search(r'column[s]?\s+(\w+)', then_stmt, re.IGNORECASE)
-            val_match = re.search(r'greater than\s+(\d+)', then_stmt, re.IGNORECASE)
+""")
+        elif 'greater_than' in keywords:
+            col_match = _COL_RE.search(then_stmt)
+            val_match = _GT_RE.search(then_stmt)
             if col_match and val_match:
                 col_name = col_match.group(1)
                 value = val_match.group(1)
                 conditions.append(f"{col_name} <= {value}")
         
-        elif 'no duplicates' in then_stmt.lower():
-            col_match = re.search(r'column[s]?\s+(\w+)', then_stmt, re.IGNORECASE)
+        elif 'no_duplicates' in keywords:
+            col_match = _COL_RE.search(then_stmt)
             if col_match:
                 col_name = col_match.group(1)
-                sql_test += f"""-- Checking for duplicates in {col_name}
+                parts.append(f"""-- Checking for duplicates in {col_name}
 select
     {col_name},
     count(*) as duplicate_count
 from {{{{ ref('{model_name}') }}}}
 group by {col_name}
 having count(*) > 1
-"""
+""")
     
     if conditions:
-        sql_test += f"""-- Validation checks
+        parts.append(f"""-- Validation checks
 select *
 from {{{{ ref('{model_name}') }}}}
 where {' or '.join(conditions)}
-"""
+""")
     
-    return sql_test
+    return ''.join(parts)
 
+@_cached_generator
 def generate_dbt_model(scenario, model_name, source_table):
     """Generate DBT model SQL"""
     
-    model_sql = f"""{{{{
+    parts = [f"""{{{{
   config(
     materialized='table',
     tags=['test_driven', '{model_name}']
@@ -189,74 +273,46 @@ def generate_dbt_model(scenario, model_name, source_table):
 
 -- Model: {model_name}
 -- Generated from scenario: {scenario['name']}
--- {' '.join(scenario['given'])}
+-- {scenario['given_joined']}
 
 with source_data as (
     select *
     from {{{{ source('raw', '{source_table}') }}}}
 ),
 
-"""
+"""]
     
-    # Add transformation logic based on When statements
-    transformations = []
+    # Add transformation logic based on When statements; each CTE reads from
+    # the one emitted before it
+    current_cte = 'source_data'
     for when_stmt in scenario['when']:
-        if 'filter' in when_stmt.lower() or 'where' in when_stmt.lower():
-            transformations.append('filtered_data')
-            condition_match = re.search(r'where\s+(.+)', when_stmt, re.IGNORECASE)
+        low = when_stmt.lower()
+        if 'filter' in low or 'where' in low:
+            condition_match = _WHERE_RE.search(when_stmt)
             if condition_match:
-                condition = condition_match.group(1)
-                model_sql += f"""filtered_data as (
-    select *
-    from source_data
-    where {condition}
-),
-
-"""
+                parts.append(_FILTERED_CTE_TMPL.format(
+                    source=current_cte, condition=condition_match.group(1)
+                ))
+                current_cte = 'filtered_data'
         
-        if 'aggregate' in when_stmt.lower() or 'group' in when_stmt.lower():
-            transformations.append('aggregated_data')
-            model_sql += """aggregated_data as (
-    select
-        -- Add your grouping columns here
-        count(*) as record_count,
-        sum(amount) as total_amount
-    from """ + (transformations[-1] if transformations else 'source_data') + """
-    group by 1
-),
-
-"""
+        if 'aggregate' in low or 'group' in low:
+            parts.append(_AGGREGATED_CTE_TMPL.format(source=current_cte))
+            current_cte = 'aggregated_data'
         
-        if 'join' in when_stmt.lower():
-            table_match = re.search(r'join\s+(\w+)', when_stmt, re.IGNORECASE)
+        if 'join' in low:
+            table_match = _JOIN_RE.search(when_stmt)
             if table_match:
-                join_table = table_match.group(1)
-                transformations.append('joined_data')
-                model_sql += f"""joined_data as (
-    select
-        a.*,
-        b.additional_field
-    from """ + (transformations[-1] if transformations else 'source_data') + f""" a
-    left join {{{{ ref('{join_table}') }}}} b
-        on a.id = b.foreign_key
-),
-
-"""
+                parts.append(_JOINED_CTE_TMPL.format(
+                    source=current_cte, join_table=table_match.group(1)
+                ))
+                current_cte = 'joined_data'
     
     # Final select
-    final_from = transformations[-1] if transformations else 'source_data'
-    model_sql += f"""final as (
-    select
-        *,
-        current_timestamp as dbt_loaded_at
-    from {final_from}
-)
-
-select * from final
-"""
+    parts.append(_FINAL_CTE_TMPL.format(source=current_cte))
     
-    return model_sql
+    return ''.join(parts)
 
+@_cached_generator
 def generate_data_test(scenario, model_name):
     """Generate custom data test macro"""
     test_name = scenario['name'].lower().replace(' ', '_')
@@ -268,8 +324,8 @@ select *
 from {{{{ model }}}}
 where
     -- Add your custom test logic here based on:
-    -- Given: {' '.join(scenario['given'])}
-    -- Then: {' '.join(scenario['then'])}
+    -- Given: {scenario['given_joined']}
+    -- Then: {scenario['then_joined']}
     1=1  -- Replace with actual test conditions
 
 {{% endmacro %}}
@@ -277,6 +333,16 @@ where
     
     return macro_sql
 
+@st.cache_data(show_spinner=False)
+def _download_ids(keys, model_name):
+    """(key, widget key, file name) for each artifact's download button"""
+    return {
+        'schema': [(key, f"download_schema_{key}", f"schema_{key}.yml") for key in keys],
+        'singular': [(key, f"download_singular_{key}", f"test_{key}.sql") for key in keys],
+        'model': [(key, f"download_model_{key}", f"{model_name}_{key}.sql") for key in keys],
+        'data_test': [(key, f"download_datatest_{key}", f"test_{key}_macro.sql") for key in keys]
+    }
+
 # Streamlit UI
 st.title("🧪 DBT Test-Driven Development Generator")
 st.markdown("Generate comprehensive DBT tests and models using Gherkin BDD syntax")
@@ -347,20 +413,23 @@ Scenario: Status field validation
                 st.session_state.gherkin_scenarios = scenarios
                 
                 # Generate all artifacts
-                st.session_state.generated_tests = {}
-                st.session_state.generated_models = {}
+                generated_tests = {}
+                generated_models = {}
                 
                 for i, scenario in enumerate(scenarios):
                     test_key = f"scenario_{i}"
-                    st.session_state.generated_tests[test_key] = {
+                    generated_tests[test_key] = {
                         'schema': generate_dbt_schema_test(scenario, model_name),
                         'singular': generate_dbt_singular_test(scenario, model_name),
                         'data_test': generate_data_test(scenario, model_name)
                     }
-                    st.session_state.generated_models[test_key] = generate_dbt_model(
+                    generated_models[test_key] = generate_dbt_model(
                         scenario, model_name, source_table
                     )
                 
+                st.session_state.generated_tests = generated_tests
+                st.session_state.generated_models = generated_models
+                
                 st.success(f"✅ Generated {len(scenarios)} test scenarios!")
             else:
                 st.error("❌ No valid scenarios found. Check your Gherkin syntax.")
@@ -387,53 +456,56 @@ with col2:
         
         # Tabs for different outputs
         tab1, tab2, tab3, tab4 = st.tabs(["📄 Schema Tests", "🧪 Singular Tests", "🔧 Models", "⚙️ Data Tests"])
+        generated_tests = st.session_state.generated_tests
+        generated_models = st.session_state.generated_models
+        download_ids = _download_ids(tuple(generated_tests), model_name)
         
         with tab1:
             st.markdown("### schema.yml - DBT Schema Tests")
-            for key, tests in st.session_state.generated_tests.items():
+            for key, widget_key, file_name in download_ids['schema']:
                 with st.expander(f"Test: {key}", expanded=True):
-                    st.code(tests['schema'], language='yaml')
+                    st.code(generated_tests[key]['schema'], language='yaml')
                     st.download_button(
                         "⬇️ Download",
-                        tests['schema'],
-                        file_name=f"schema_{key}.yml",
-                        key=f"download_schema_{key}"
+                        generated_tests[key]['schema'],
+                        file_name=file_name,
+                        key=widget_key
                     )
         
         with tab2:
             st.markdown("### Singular Tests (SQL)")
-            for key, tests in st.session_state.generated_tests.items():
+            for key, widget_key, file_name in download_ids['singular']:
                 with st.expander(f"Test: {key}", expanded=True):
-                    st.code(tests['singular'], language='sql')
+                    st.code(generated_tests[key]['singular'], language='sql')
                     st.download_button(
                         "⬇️ Download",
-                        tests['singular'],
-                        file_name=f"test_{key}.sql",
-                        key=f"download_singular_{key}"
+                        generated_tests[key]['singular'],
+                        file_name=file_name,
+                        key=widget_key
                     )
         
         with tab3:
             st.markdown("### DBT Models")
-            for key, model in st.session_state.generated_models.items():
+            for key, widget_key, file_name in download_ids['model']:
                 with st.expander(f"Model: {key}", expanded=True):
-                    st.code(model, language='sql')
+                    st.code(generated_models[key], language='sql')
                     st.download_button(
                         "⬇️ Download",
-                        model,
-                        file_name=f"{model_name}_{key}.sql",
-                        key=f"download_model_{key}"
+                        generated_models[key],
+                        file_name=file_name,
+                        key=widget_key
                     )
         
         with tab4:
             st.markdown("### Custom Data Tests (Macros)")
-            for key, tests in st.session_state.generated_tests.items():
+            for key, widget_key, file_name in download_ids['data_test']:
                 with st.expander(f"Data Test: {key}", expanded=True):
-                    st.code(tests['data_test'], language='sql')
+                    st.code(generated_tests[key]['data_test'], language='sql')
                     st.download_button(
                         "⬇️ Download",
-                        tests['data_test'],
-                        file_name=f"test_{key}_macro.sql",
-                        key=f"download_datatest_{key}"
+                        generated_tests[key]['data_test'],
+                        file_name=file_name,
+                        key=widget_key
                     )
     else:
         st.info("👈 Write Gherkin scenarios and click 'Parse & Generate' to see results")
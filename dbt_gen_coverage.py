@@ -1,16 +1,34 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import os
 import yaml
+import io
 import json
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
 import tempfile
+import threading
 import shutil
 import re
 from datetime import datetime
-from collections import defaultdict
-import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from html import escape as html_escape
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Page configuration with custom theme
 st.set_page_config(
@@ -20,8 +38,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for enhanced UI
-st.markdown("""
+
+@st.cache_resource
+def _custom_css() -> str:
+    """Custom CSS for enhanced UI, built once per server process"""
+    return """
 <style>
     /* Import Google Fonts */
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
@@ -86,6 +107,13 @@ st.markdown("""
         transform: scale(1.05);
     }
 
+    .metric-grid {
+        display: grid;
+        grid-auto-flow: column;
+        grid-auto-columns: 1fr;
+        gap: 1rem;
+    }
+
     .metric-value {
         font-size: 2.5rem;
         font-weight: 700;
@@ -241,56 +269,167 @@ st.markdown("""
         box-shadow: 0 6px 20px rgba(17, 153, 142, 0.6);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+# The page is rebuilt on every rerun, so the cached stylesheet is re-emitted each time
+st.markdown(_custom_css(), unsafe_allow_html=True)
+
+
+@st.cache_resource
+def _sidebar_badge_html() -> str:
+    """Version badge at the bottom of the sidebar; static, so built once per server process"""
+    return """
+        <div style="text-align: center; padding: 20px; background: rgba(102, 126, 234, 0.1); border-radius: 10px;">
+            <p style="margin: 0; font-size: 0.85rem; color: #667eea;">
+                <strong>DBT Test Generator Pro v2.0</strong><br>
+                Powered by AI & Gherkin DSL
+            </p>
+        </div>
+        """
+
+
+@st.cache_resource
+def _footer_html() -> str:
+    """Page footer banner; static, so built once per server process"""
+    return """
+    <div style="text-align: center; padding: 30px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 15px; margin-top: 50px;">
+        <h3 style="color: white; margin: 0;">🚀 Ready to Transform Your DBT Testing?</h3>
+        <p style="color: rgba(255,255,255,0.9); margin: 10px 0 0 0;">
+            Generate comprehensive tests in seconds with AI-powered automation
+        </p>
+    </div>
+    """
+
+
+_FEATURE_CARD_OPEN = '<div class="feature-card">'
+_FEATURE_CARD_CLOSE = '</div>'
+
+
+_METRIC_CARD_HTML = '<div class="metric-card"><div class="metric-label">{}</div><div class="metric-value">{}</div></div>'
+_METRIC_GRID_HTML = '<div class="metric-grid">{}</div>'
+
+
+def _metric_cards(cards: List[Tuple[str, object]]) -> str:
+    """One grid of metric cards, so a row costs a single st.markdown delta"""
+    metric_card = _METRIC_CARD_HTML.format
+    return _METRIC_GRID_HTML.format(''.join(metric_card(label, value) for label, value in cards))
+
+
+# (connect, read) seconds; the read timeout applies between streamed chunks, not to the whole response
+_HTTP_TIMEOUT = (5, 60)
+
+
+def _pooled_session(retries: Retry) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+@st.cache_resource
+def _http_session() -> requests.Session:
+    """Shared session for GETs (GitHub, batch polling); safe to retry on 429/5xx and timeouts"""
+    return _pooled_session(Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        raise_on_status=False
+    ))
+
+
+@st.cache_resource
+def _http_post_session() -> requests.Session:
+    """Shared session for LLM POSTs: completions, file uploads and batch submissions.
+
+    These are billed and not idempotent. A 5xx or read timeout may arrive after the provider
+    accepted the request, so only connection failures and 429 rejections are retried.
+    """
+    return _pooled_session(Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429],
+        allowed_methods=['POST'],
+        raise_on_status=False
+    ))
+
+
+# Uncached LLM completions in flight at once across all sessions, to stay inside provider rate limits
+_LLM_MAX_IN_FLIGHT = 8
+
+
+@st.cache_resource
+def _llm_request_slots() -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(_LLM_MAX_IN_FLIGHT)
+
+
+def _content_hash(text: str) -> str:
+    """Short digest standing in for large text (model SQL) in cache keys"""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _set_feature_name(feature: Dict, body: str):
+    feature['name'] = body
+
+
+def _add_scenario(feature: Dict, body: str):
+    feature['scenarios'].append({
+        'name': body,
+        'given': [],
+        'when': [],
+        'then': []
+    })
+
+
+def _add_step(step: str):
+    def handler(feature: Dict, body: str):
+        if feature['scenarios']:
+            feature['scenarios'][-1][step].append(body)
+    return handler
+
+
+def _add_and_step(feature: Dict, body: str):
+    if feature['scenarios']:
+        scenario = feature['scenarios'][-1]
+        for step in ('then', 'when', 'given'):
+            if scenario[step]:
+                scenario[step].append(body)
+                break
 
 
 class GherkinDSLParser:
     """Parse Gherkin-style test specifications"""
 
+    # Anchored per line under MULTILINE so one finditer classifies the whole text in C
+    _LINE_RE = re.compile(
+        r'^[^\S\n]*(Feature:|Scenario:|Given|When|Then|And)[^\S\n]*((?:.*\S)?)[^\S\n]*$',
+        re.MULTILINE
+    )
+    _HANDLERS = {
+        'Feature:': _set_feature_name,
+        'Scenario:': _add_scenario,
+        'Given': _add_step('given'),
+        'When': _add_step('when'),
+        'Then': _add_step('then'),
+        'And': _add_and_step
+    }
+
     @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=64)
     def parse_feature(feature_text: str) -> Dict:
         """Parse a Gherkin feature into structured data"""
-        lines = feature_text.strip().split('\n')
         feature = {
             'name': '',
             'description': '',
             'scenarios': []
         }
 
-        current_scenario = None
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Feature:'):
-                feature['name'] = line.replace('Feature:', '').strip()
-            elif line.startswith('Scenario:'):
-                if current_scenario:
-                    feature['scenarios'].append(current_scenario)
-                current_scenario = {
-                    'name': line.replace('Scenario:', '').strip(),
-                    'given': [],
-                    'when': [],
-                    'then': []
-                }
-            elif line.startswith('Given'):
-                if current_scenario:
-                    current_scenario['given'].append(line.replace('Given', '').strip())
-            elif line.startswith('And') and current_scenario:
-                if current_scenario['then']:
-                    current_scenario['then'].append(line.replace('And', '').strip())
-                elif current_scenario['when']:
-                    current_scenario['when'].append(line.replace('And', '').strip())
-                elif current_scenario['given']:
-                    current_scenario['given'].append(line.replace('And', '').strip())
-            elif line.startswith('When'):
-                if current_scenario:
-                    current_scenario['when'].append(line.replace('When', '').strip())
-            elif line.startswith('Then'):
-                if current_scenario:
-                    current_scenario['then'].append(line.replace('Then', '').strip())
-
-        if current_scenario:
-            feature['scenarios'].append(current_scenario)
+        handlers = GherkinDSLParser._HANDLERS
+        for keyword, body in GherkinDSLParser._LINE_RE.findall(feature_text):
+            handlers[keyword](feature, body)
 
         return feature
 
@@ -298,7 +437,14 @@ class GherkinDSLParser:
 class DBTTestGenerator:
     """Generate DBT tests from Gherkin specifications"""
 
+    _COLUMN_RE = re.compile(r'column[s]?\s+["\']?(\w+)["\']?', re.IGNORECASE)
+    _VALUES_RE = re.compile(r'\[(.*?)\]')
+    _REFERENCE_RE = re.compile(r'to\s+["\']?(\w+)["\']?', re.IGNORECASE)
+    # Whitespace-delimited identifiers of three or more characters
+    _IDENTIFIER_RE = re.compile(r'(?<!\S)[^\W\d]\w{2,}(?!\S)')
+
     @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=256)
     def generate_schema_tests(feature: Dict, model_name: str) -> str:
         """Generate schema.yml tests"""
         tests = []
@@ -322,26 +468,26 @@ class DBTTestGenerator:
                     if ref_table:
                         tests.append(f"      - relationships:\n          to: ref('{ref_table}')\n          field: id")
 
-        schema = f"""version: 2
+        schema = [f"""version: 2
 
 models:
   - name: {model_name}
     description: "Generated from Gherkin feature: {feature['name']}"
     columns:
-"""
+"""]
 
-        columns = DBTTestGenerator._extract_all_columns(feature)
-        for col in columns:
-            schema += f"      - name: {col}\n"
-            schema += f"        description: \"{col} column\"\n"
-            if tests:
-                schema += f"        tests:\n"
-                for test in tests[:2]:
-                    schema += f"        {test}\n"
+        # Every column gets the same test block, so render it once
+        tests_block = ''
+        if tests:
+            tests_block = "        tests:\n" + ''.join(f"        {test}\n" for test in tests[:2])
+        for col in DBTTestGenerator._extract_all_columns(feature):
+            schema.append(f"      - name: {col}\n        description: \"{col} column\"\n")
+            schema.append(tests_block)
 
-        return schema
+        return ''.join(schema)
 
     @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=256)
     def generate_unit_test(feature: Dict, model_name: str) -> str:
         """Generate DBT unit test SQL"""
         test_name = f"test_{model_name}_{feature['name'].lower().replace(' ', '_')}"
@@ -404,31 +550,30 @@ where not exists (
 
     @staticmethod
     def _extract_column(text: str) -> Optional[str]:
-        match = re.search(r'column[s]?\s+["\']?(\w+)["\']?', text, re.IGNORECASE)
+        match = DBTTestGenerator._COLUMN_RE.search(text)
         return match.group(1) if match else None
 
     @staticmethod
     def _extract_values(text: str) -> Optional[List]:
-        match = re.search(r'\[(.*?)\]', text)
+        match = DBTTestGenerator._VALUES_RE.search(text)
         if match:
             return [v.strip().strip("'\"") for v in match.group(1).split(',')]
         return None
 
     @staticmethod
     def _extract_reference(text: str) -> Optional[str]:
-        match = re.search(r'to\s+["\']?(\w+)["\']?', text, re.IGNORECASE)
+        match = DBTTestGenerator._REFERENCE_RE.search(text)
         return match.group(1) if match else None
 
     @staticmethod
     def _extract_all_columns(feature: Dict) -> List[str]:
-        columns = set()
-        for scenario in feature['scenarios']:
-            for clauses in [scenario['given'], scenario['when'], scenario['then']]:
-                for clause in clauses:
-                    words = clause.split()
-                    for word in words:
-                        if word.isidentifier() and len(word) > 2:
-                            columns.add(word.lower())
+        text = ' '.join(
+            clause
+            for scenario in feature['scenarios']
+            for clauses in (scenario['given'], scenario['when'], scenario['then'])
+            for clause in clauses
+        )
+        columns = {word.lower() for word in DBTTestGenerator._IDENTIFIER_RE.findall(text)}
         return list(columns)[:5]
 
     @staticmethod
@@ -447,7 +592,7 @@ class DBTModelGenerator:
     def generate_model(model_name: str, feature: Dict, model_type: str = "view") -> str:
         """Generate a DBT model SQL file"""
 
-        sql = f"""{{{{
+        sql = [f"""{{{{
     config(
         materialized='{model_type}',
         tags=['auto-generated']
@@ -461,20 +606,17 @@ class DBTModelGenerator:
 
     Description:
     This model was auto-generated from Gherkin specifications.
-"""
+"""]
 
         for scenario in feature['scenarios']:
-            sql += f"\n    Scenario: {scenario['name']}\n"
-            for given in scenario['given']:
-                sql += f"    - Given: {given}\n"
-            for when in scenario['when']:
-                sql += f"    - When: {when}\n"
-            for then in scenario['then']:
-                sql += f"    - Then: {then}\n"
+            sql.append(f"\n    Scenario: {scenario['name']}\n")
+            sql.extend(f"    - Given: {given}\n" for given in scenario['given'])
+            sql.extend(f"    - When: {when}\n" for when in scenario['when'])
+            sql.extend(f"    - Then: {then}\n" for then in scenario['then'])
 
-        sql += "*/\n\n"
+        sql.append("*/\n\n")
 
-        sql += """select
+        sql.append("""select
     id,
     created_at,
     updated_at,
@@ -482,55 +624,132 @@ class DBTModelGenerator:
     value
 from {{ source('raw', 'source_table') }}
 where 1=1
-"""
+""")
 
-        return sql
+        return ''.join(sql)
 
 
 class GitHubHandler:
     """Handle GitHub repository operations"""
 
+    _DOWNLOAD_WORKERS = 16
+
     @staticmethod
     def fetch_dbt_models(github_url: str, token: Optional[str] = None) -> List[Dict]:
         """Fetch DBT models from GitHub repository"""
         try:
-            parts = github_url.replace('https://github.com/', '').split('/')
-            owner, repo = parts[0], parts[1]
-            branch = 'main'
-            path = '/'.join(parts[3:]) if len(parts) > 3 else 'models'
+            token_hash = hashlib.blake2b(token.encode(), digest_size=16).hexdigest() if token else ''
+            return GitHubHandler._fetch_models(github_url, token_hash, token)
+        except Exception as e:
+            st.error(f"Error fetching from GitHub: {str(e)}")
+            return []
 
-            api_url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
+    @staticmethod
+    @st.cache_data(ttl=600, show_spinner=False)
+    def _fetch_models(github_url: str, token_hash: str, _token: Optional[str]) -> List[Dict]:
+        # Failures raise instead of returning [], so st.cache_data never stores them
+        parts = github_url.replace('https://github.com/', '').strip('/').split('/')
+        owner, repo = parts[0], parts[1]
+        branch = 'main'
+        if len(parts) > 3 and parts[2] in ('tree', 'blob'):
+            branch = parts[3]
+            parts = parts[:2] + parts[4:]
+        path = '/'.join(parts[2:]) if len(parts) > 2 else 'models'
+
+        # One recursive tree listing covers nested model folders; a branch name is a valid tree-ish
+        api_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{branch}"
+
+        headers = {}
+        if _token:
+            headers['Authorization'] = f'token {_token}'
+
+        session = _http_session()
+        response = session.get(api_url, headers=headers, params={'recursive': '1'}, timeout=_HTTP_TIMEOUT)
+        response.raise_for_status()
+        tree = response.json()
+        if tree.get('truncated'):
+            st.warning("Repository tree is too large for a single listing; some models may be missing")
+
+        prefix = f"{path}/"
+        sql_paths = [
+            item['path'] for item in tree['tree']
+            if item['type'] == 'blob' and item['path'].startswith(prefix) and item['path'].endswith('.sql')
+        ]
+
+        # Raw downloads are independent, so overlap their round trips
+        raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/"
+
+        def download(sql_path: str) -> str:
+            raw = session.get(raw_url + sql_path, headers=headers, timeout=_HTTP_TIMEOUT)
+            raw.raise_for_status()
+            return raw.text
+
+        with ThreadPoolExecutor(max_workers=GitHubHandler._DOWNLOAD_WORKERS) as executor:
+            contents = list(executor.map(download, sql_paths))
+
+        return [
+            {
+                'name': Path(sql_path).stem,
+                'path': sql_path,
+                'content': content,
+                'content_hash': _content_hash(content)
+            }
+            for sql_path, content in zip(sql_paths, contents)
+        ]
 
-            headers = {}
-            if token:
-                headers['Authorization'] = f'token {token}'
 
-            response = requests.get(api_url, headers=headers, params={'ref': branch})
-            response.raise_for_status()
+class LocalFolderHandler:
+    """Handle DBT models stored in a local directory"""
 
-            files = response.json()
-            models = []
+    _READ_WORKERS = 16
 
-            for file in files:
-                if file['name'].endswith('.sql'):
-                    content_response = requests.get(file['download_url'])
-                    models.append({
-                        'name': file['name'].replace('.sql', ''),
-                        'path': file['path'],
-                        'content': content_response.text
-                    })
+    @staticmethod
+    def load_dbt_models(path: Path) -> List[Dict]:
+        """Load DBT models from a folder, re-reading only when its .sql files change"""
+        sql_files = sorted(path.glob("*.sql"))
+        fingerprint = tuple((file.name, file.stat().st_mtime_ns) for file in sql_files)
+        return LocalFolderHandler._read_models(str(path), fingerprint)
 
-            return models
-        except Exception as e:
-            st.error(f"Error fetching from GitHub: {str(e)}")
-            return []
+    @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=16)
+    def _read_models(folder_path: str, fingerprint: Tuple[Tuple[str, int], ...]) -> List[Dict]:
+        folder = Path(folder_path)
+        # Overlap per-file open/read latency on large model folders
+        def read_model(entry: Tuple[str, int]) -> Dict:
+            content = (folder / entry[0]).read_text()
+            return {
+                'name': Path(entry[0]).stem,
+                'path': str(folder / entry[0]),
+                'content': content,
+                'content_hash': _content_hash(content)
+            }
+
+        with ThreadPoolExecutor(max_workers=LocalFolderHandler._READ_WORKERS) as executor:
+            return list(executor.map(read_model, fingerprint))
 
 
 class LLMHandler:
     """Handle LLM API calls for generating Gherkin and tests"""
 
+    _SECTION_RE = re.compile(r'===(SCHEMA\.YML|UNIT_TEST\.SQL|MODEL\.SQL)===')
+    _SECTION_KEYS = {'SCHEMA.YML': 'schema', 'UNIT_TEST.SQL': 'unit_test', 'MODEL.SQL': 'model'}
+    _GENERATE_WORKERS = 8
+    BATCH_PROVIDERS = ("OpenAI", "Anthropic")
+
+    @staticmethod
+    def _stream_lines(response: requests.Response) -> Iterator[Dict]:
+        """Yield the JSON payload of each streamed frame (SSE `data:` lines or NDJSON lines)"""
+        for line in response.iter_lines():
+            if line.startswith(b'data:'):
+                line = line[5:].strip()
+                if line == b'[DONE]':
+                    return
+            elif not line.startswith(b'{'):
+                continue
+            yield json.loads(line)
+
     @staticmethod
-    def call_openai(prompt: str, api_key: str, model: str) -> str:
+    def call_openai(prompt: str, api_key: str, model: str) -> Iterator[str]:
         try:
             headers = {
                 "Authorization": f"Bearer {api_key}",
@@ -544,22 +763,27 @@ class LLMHandler:
                     {"role": "user", "content": prompt}
                 ],
                 "temperature": 0.7,
-                "max_tokens": 2000
+                "max_tokens": 2000,
+                "stream": True
             }
 
-            response = requests.post(
+            with _http_post_session().post(
                 "https://api.openai.com/v1/chat/completions",
                 headers=headers,
-                json=data
-            )
-            response.raise_for_status()
-
-            return response.json()['choices'][0]['message']['content']
+                json=data,
+                stream=True,
+                timeout=_HTTP_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+
+                for frame in LLMHandler._stream_lines(response):
+                    if frame['choices']:
+                        yield frame['choices'][0]['delta'].get('content') or ''
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
 
     @staticmethod
-    def call_anthropic(prompt: str, api_key: str, model: str) -> str:
+    def call_anthropic(prompt: str, api_key: str, model: str) -> Iterator[str]:
         try:
             headers = {
                 "x-api-key": api_key,
@@ -572,22 +796,30 @@ class LLMHandler:
                 "max_tokens": 2000,
                 "messages": [
                     {"role": "user", "content": prompt}
-                ]
+                ],
+                "stream": True
             }
 
-            response = requests.post(
+            with _http_post_session().post(
                 "https://api.anthropic.com/v1/messages",
                 headers=headers,
-                json=data
-            )
-            response.raise_for_status()
-
-            return response.json()['content'][0]['text']
+                json=data,
+                stream=True,
+                timeout=_HTTP_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+
+                for frame in LLMHandler._stream_lines(response):
+                    if frame['type'] == 'content_block_delta':
+                        yield frame['delta'].get('text', '')
+                    elif frame['type'] == 'error':
+                        # e.g. overloaded_error mid-stream; ending quietly would return truncated text
+                        raise Exception(frame.get('error', {}).get('message', 'stream error'))
         except Exception as e:
             raise Exception(f"Anthropic API error: {str(e)}")
 
     @staticmethod
-    def call_azure_openai(prompt: str, api_key: str, endpoint: str, model: str) -> str:
+    def call_azure_openai(prompt: str, api_key: str, endpoint: str, model: str) -> Iterator[str]:
         try:
             headers = {
                 "api-key": api_key,
@@ -600,35 +832,43 @@ class LLMHandler:
                     {"role": "user", "content": prompt}
                 ],
                 "temperature": 0.7,
-                "max_tokens": 2000
+                "max_tokens": 2000,
+                "stream": True
             }
 
             url = f"{endpoint}/openai/deployments/{model}/chat/completions?api-version=2023-05-15"
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-
-            return response.json()['choices'][0]['message']['content']
+            with _http_post_session().post(
+                url, headers=headers, json=data, stream=True, timeout=_HTTP_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+
+                for frame in LLMHandler._stream_lines(response):
+                    if frame['choices']:
+                        yield frame['choices'][0]['delta'].get('content') or ''
         except Exception as e:
             raise Exception(f"Azure OpenAI API error: {str(e)}")
 
     @staticmethod
-    def call_local_llm(prompt: str, endpoint: str, model: str) -> str:
+    def call_local_llm(prompt: str, endpoint: str, model: str) -> Iterator[str]:
         try:
             data = {
                 "model": model,
                 "prompt": prompt,
-                "stream": False
+                "stream": True
             }
 
-            response = requests.post(f"{endpoint}/api/generate", json=data)
-            response.raise_for_status()
+            with _http_post_session().post(
+                f"{endpoint}/api/generate", json=data, stream=True, timeout=_HTTP_TIMEOUT
+            ) as response:
+                response.raise_for_status()
 
-            return response.json()['response']
+                for frame in LLMHandler._stream_lines(response):
+                    yield frame.get('response', '')
         except Exception as e:
             raise Exception(f"Local LLM error: {str(e)}")
 
     @staticmethod
-    def generate_from_llm(config: Dict, prompt: str) -> str:
+    def stream_from_llm(config: Dict, prompt: str) -> Iterator[str]:
         provider = config['provider']
 
         if provider == "OpenAI":
@@ -643,7 +883,30 @@ class LLMHandler:
             raise Exception(f"Unknown provider: {provider}")
 
     @staticmethod
-    def plain_english_to_gherkin(description: str, config: Dict) -> str:
+    @st.cache_data(persist="disk", max_entries=1024, show_spinner=False)
+    def _cached_completion(provider: str, model: str, endpoint: Optional[str], prompt_hash: str,
+                           api_key_hash: str, _prompt: str, _config: Dict) -> str:
+        # Underscored args are excluded from the cache key: the hashes stand in for the prompt and raw key
+        with _llm_request_slots():
+            completion = ''.join(LLMHandler.stream_from_llm(_config, _prompt))
+        # Raising keeps an empty answer out of the persistent cache
+        if not completion.strip():
+            raise Exception(f"{provider} returned an empty completion")
+        return completion
+
+    @staticmethod
+    def request_key(config: Dict, prompt: str) -> Tuple[str, str, Optional[str], str, str]:
+        """Cache key for a prompt; whitespace-only edits to the prompt map to the same key"""
+        prompt_hash = hashlib.sha256(' '.join(prompt.split()).encode()).hexdigest()
+        api_key_hash = hashlib.blake2b((config.get('api_key') or '').encode(), digest_size=16).hexdigest()
+        return config['provider'], config['model'], config.get('endpoint'), prompt_hash, api_key_hash
+
+    @staticmethod
+    def generate_from_llm(config: Dict, prompt: str) -> str:
+        return LLMHandler._cached_completion(*LLMHandler.request_key(config, prompt), prompt, config)
+
+    @staticmethod
+    def plain_english_to_gherkin(description: str, config: Dict) -> Iterator[str]:
         prompt = f"""Convert the following plain English description into a well-structured Gherkin feature specification for DBT testing.
 
 Plain English Description:
@@ -657,11 +920,11 @@ Generate a complete Gherkin feature with:
 
 Format the output as a valid Gherkin feature specification."""
 
-        return LLMHandler.generate_from_llm(config, prompt)
+        return LLMHandler.stream_from_llm(config, prompt)
 
     @staticmethod
-    def gherkin_to_tests(gherkin: str, model_name: str, config: Dict) -> Dict[str, str]:
-        prompt = f"""Given the following Gherkin specification, generate comprehensive DBT tests and a model.
+    def tests_prompt(gherkin: str, model_name: str) -> str:
+        return f"""Given the following Gherkin specification, generate comprehensive DBT tests and a model.
 
 Model Name: {model_name}
 
@@ -687,59 +950,300 @@ Format your response EXACTLY as follows:
 
 Ensure all generated code is valid DBT syntax and follows best practices."""
 
-        response = LLMHandler.generate_from_llm(config, prompt)
+    @staticmethod
+    def parse_tests(response: str) -> Dict[str, str]:
+        """Split a tests completion into its schema, unit_test and model sections"""
+        sections = LLMHandler._SECTION_RE.split(response)
+        found = dict(zip(sections[1::2], sections[2::2]))
 
         parts = {
-            'schema': '',
-            'unit_test': '',
-            'model': ''
+            key: found.get(marker, '').strip()
+            for marker, key in LLMHandler._SECTION_KEYS.items()
         }
 
-        if '===SCHEMA.YML===' in response:
-            schema_start = response.find('===SCHEMA.YML===') + len('===SCHEMA.YML===')
-            schema_end = response.find('===UNIT_TEST.SQL===')
-            parts['schema'] = response[schema_start:schema_end].strip()
+        return parts
 
-        if '===UNIT_TEST.SQL===' in response:
-            test_start = response.find('===UNIT_TEST.SQL===') + len('===UNIT_TEST.SQL===')
-            test_end = response.find('===MODEL.SQL===')
-            parts['unit_test'] = response[test_start:test_end].strip()
+    @staticmethod
+    def gherkin_to_tests(gherkin: str, model_name: str, config: Dict) -> Dict[str, str]:
+        response = LLMHandler.generate_from_llm(config, LLMHandler.tests_prompt(gherkin, model_name))
+        return LLMHandler.parse_tests(response)
 
-        if '===MODEL.SQL===' in response:
-            model_start = response.find('===MODEL.SQL===') + len('===MODEL.SQL===')
-            parts['model'] = response[model_start:].strip()
+    @staticmethod
+    def model_gherkin_prompt(model: Dict) -> str:
+        return f"""Analyze this DBT model and create comprehensive Gherkin tests:
 
-        return parts
+Model: {model['name']}
+SQL:
+{model['content']}
+
+Generate Gherkin covering data quality, business logic, relationships, and validations."""
+
+    @staticmethod
+    def model_to_tests(model: Dict, config: Dict) -> Dict[str, str]:
+        """Gherkin spec and AI tests for a loaded model, without streaming the spec to the page"""
+        gherkin = LLMHandler.generate_from_llm(config, LLMHandler.model_gherkin_prompt(model))
+        return LLMHandler.gherkin_to_tests(gherkin, model['name'], config)
+
+    @staticmethod
+    def generate_for_models(models: List[Dict], config: Dict) -> Dict[str, object]:
+        """AI tests for many models, with their LLM round trips in flight together.
+
+        Maps each model name to its gherkin_to_tests parts, or to the exception it raised.
+        """
+        def generate(model: Dict) -> object:
+            try:
+                return LLMHandler.model_to_tests(model, config)
+            except Exception as e:
+                return e
+
+        # Workers share the script context so the st.cache_data completion cache works from them
+        with ThreadPoolExecutor(
+                max_workers=config.get('parallelism', LLMHandler._GENERATE_WORKERS),
+                initializer=add_script_run_ctx,
+                initargs=(None, get_script_run_ctx())
+        ) as executor:
+            results = list(executor.map(generate, models))
+
+        return {model['name']: result for model, result in zip(models, results)}
+
+    @staticmethod
+    def submit_batch(prompts: Dict[str, str], config: Dict) -> str:
+        """Queue prompts on the provider's Batch API and return the batch id.
+
+        Batches are billed at roughly half the live rate and finish within 24 hours;
+        prompts are keyed by custom ids ([A-Za-z0-9_-], at most 64 characters).
+        """
+        provider = config['provider']
+
+        if provider == "OpenAI":
+            headers = {"Authorization": f"Bearer {config['api_key']}"}
+            lines = ''.join(
+                json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": config['model'],
+                        "messages": [
+                            {"role": "system", "content": "You are an expert in DBT and Gherkin test specifications."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": 0.7,
+                        "max_tokens": 2000
+                    }
+                }) + '\n'
+                for custom_id, prompt in prompts.items()
+            )
+            try:
+                upload = _http_post_session().post(
+                    "https://api.openai.com/v1/files",
+                    headers=headers,
+                    data={"purpose": "batch"},
+                    files={"file": ("batch.jsonl", lines.encode('utf-8'))},
+                    timeout=_HTTP_TIMEOUT
+                )
+                upload.raise_for_status()
+
+                response = _http_post_session().post(
+                    "https://api.openai.com/v1/batches",
+                    headers=headers,
+                    json={
+                        "input_file_id": upload.json()['id'],
+                        "endpoint": "/v1/chat/completions",
+                        "completion_window": "24h"
+                    },
+                    timeout=_HTTP_TIMEOUT
+                )
+                response.raise_for_status()
+                return response.json()['id']
+            except Exception as e:
+                raise Exception(f"OpenAI API error: {str(e)}")
+        elif provider == "Anthropic":
+            try:
+                response = _http_post_session().post(
+                    "https://api.anthropic.com/v1/messages/batches",
+                    headers={
+                        "x-api-key": config['api_key'],
+                        "Content-Type": "application/json",
+                        "anthropic-version": "2023-06-01"
+                    },
+                    json={"requests": [
+                        {
+                            "custom_id": custom_id,
+                            "params": {
+                                "model": config['model'],
+                                "max_tokens": 2000,
+                                "messages": [{"role": "user", "content": prompt}]
+                            }
+                        }
+                        for custom_id, prompt in prompts.items()
+                    ]},
+                    timeout=_HTTP_TIMEOUT
+                )
+                response.raise_for_status()
+                return response.json()['id']
+            except Exception as e:
+                raise Exception(f"Anthropic API error: {str(e)}")
+        else:
+            raise Exception(f"Batch API not supported for provider: {provider}")
+
+    @staticmethod
+    def batch_results(batch_id: str, config: Dict) -> Optional[Dict[str, str]]:
+        """Completion text per custom id once the batch has ended, or None while it is still running.
+
+        Requests that failed inside a finished batch are left out of the result.
+        """
+        provider = config['provider']
+        session = _http_session()
+
+        if provider == "OpenAI":
+            headers = {"Authorization": f"Bearer {config['api_key']}"}
+            try:
+                response = session.get(
+                    f"https://api.openai.com/v1/batches/{batch_id}", headers=headers, timeout=_HTTP_TIMEOUT
+                )
+                response.raise_for_status()
+                batch = response.json()
+                if batch['status'] in ('failed', 'expired', 'cancelled'):
+                    raise Exception(f"batch {batch['status']}")
+                if batch['status'] != 'completed':
+                    return None
+                if not batch.get('output_file_id'):
+                    return {}
+
+                output = session.get(
+                    f"https://api.openai.com/v1/files/{batch['output_file_id']}/content",
+                    headers=headers,
+                    timeout=_HTTP_TIMEOUT
+                )
+                output.raise_for_status()
+            except Exception as e:
+                raise Exception(f"OpenAI API error: {str(e)}")
+
+            results = {}
+            for line in output.iter_lines():
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if entry['response'] and entry['response']['status_code'] == 200:
+                    results[entry['custom_id']] = entry['response']['body']['choices'][0]['message']['content']
+            return results
+        elif provider == "Anthropic":
+            headers = {"x-api-key": config['api_key'], "anthropic-version": "2023-06-01"}
+            try:
+                response = session.get(
+                    f"https://api.anthropic.com/v1/messages/batches/{batch_id}", headers=headers, timeout=_HTTP_TIMEOUT
+                )
+                response.raise_for_status()
+                batch = response.json()
+                if batch['processing_status'] != 'ended':
+                    return None
+
+                output = session.get(batch['results_url'], headers=headers, timeout=_HTTP_TIMEOUT)
+                output.raise_for_status()
+            except Exception as e:
+                raise Exception(f"Anthropic API error: {str(e)}")
+
+            results = {}
+            for line in output.iter_lines():
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if entry['result']['type'] == 'succeeded':
+                    results[entry['custom_id']] = ''.join(
+                        block['text'] for block in entry['result']['message']['content'] if block['type'] == 'text'
+                    )
+            return results
+        else:
+            raise Exception(f"Batch API not supported for provider: {provider}")
+
+
+class ModelCoverage(TypedDict):
+    """One models_detail entry; a plain dict like the rest of the report, since the JSON export needs
+    no encoder hook for it and the stdlib json fallback could not serialize a dataclass at all"""
+    name: str
+    total_columns: int
+    tested_columns: int
+    coverage_percentage: float
+    columns: List[str]
+    tested_columns_list: List[str]
+    untested_columns: List[str]
+    tests: Dict[str, List[str]]
+
+
+class CoverageSummary(TypedDict):
+    unique_tests: int
+    not_null_tests: int
+    accepted_values_tests: int
+    relationships_tests: int
+    custom_tests: int
+
+
+class CoverageReport(TypedDict):
+    """Shape of the report from analyze_coverage; plain dicts, so orjson serializes it natively"""
+    total_models: int
+    models_with_tests: int
+    total_columns: int
+    columns_with_tests: int
+    total_untested_columns: int
+    coverage_percentage: float
+    coverage_band: str
+    models_detail: List[ModelCoverage]
+    summary: CoverageSummary
+    total_tests: int
+    generated_at: str
 
 
 class CodeCoverageAnalyzer:
     """Analyze and generate code coverage reports for DBT models and tests"""
 
+    _SELECT_RE = re.compile(r'select\s+(.*?)\s+from', re.IGNORECASE | re.DOTALL)
+    _LINE_COMMENT_RE = re.compile(r'--.*')
+    _BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+    _ALIAS_RE = re.compile(r'\s+as\s+', re.IGNORECASE)
+    _SQL_KEYWORDS = frozenset({'from', 'where', 'group', 'order', 'having'})
+    GOOD_COVERAGE = 80
+    MIN_COVERAGE = 60
+    _BAND_COLORS = {'success': '#4CAF50', 'warning': '#FF9800', 'danger': '#F44336'}
+    _TEST_BUCKETS = {
+        'unique': 'unique_tests',
+        'not_null': 'not_null_tests',
+        'accepted_values': 'accepted_values_tests',
+        'relationships': 'relationships_tests'
+    }
+    _MODEL_HTML = """<div class="model-detail">
+        <h3>📄 {name} - {coverage:.1f}%</h3>
+        <p><strong>{tested_columns}</strong> of <strong>{total_columns}</strong> columns tested</p>
+        <div>{columns}</div></div>"""
+    _TESTED_COLUMN_HTML = '<span class="column tested">✓ {col}</span>'
+    _UNTESTED_COLUMN_HTML = '<span class="column untested">✗ {col}</span>'
+
     @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=256)
     def extract_columns_from_model(model_sql: str) -> List[str]:
-        columns = []
-        select_pattern = r'select\s+(.*?)\s+from'
-        matches = re.findall(select_pattern, model_sql, re.IGNORECASE | re.DOTALL)
+        columns = {}
+        matches = CodeCoverageAnalyzer._SELECT_RE.findall(model_sql)
 
         for match in matches:
             cols = match.split(',')
             for col in cols:
-                col = re.sub(r'--.*', '', col)
-                col = re.sub(r'/\*.*?\*/', '', col, flags=re.DOTALL)
-                col = re.sub(r'\s+as\s+', ' ', col, re.IGNORECASE)
+                col = CodeCoverageAnalyzer._LINE_COMMENT_RE.sub('', col)
+                col = CodeCoverageAnalyzer._BLOCK_COMMENT_RE.sub('', col)
+                col = CodeCoverageAnalyzer._ALIAS_RE.sub(' ', col)
 
                 words = col.strip().split()
                 if words:
                     col_name = words[-1].strip('()')
-                    if col_name and col_name not in ['from', 'where', 'group', 'order', 'having']:
-                        columns.append(col_name)
+                    if col_name and col_name not in CodeCoverageAnalyzer._SQL_KEYWORDS:
+                        columns[col_name] = None
 
-        return list(set(columns))
+        return list(columns)
 
     @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=256)
     def extract_tests_from_schema(schema_yaml: str) -> Dict[str, List[str]]:
         try:
-            schema_data = yaml.safe_load(schema_yaml)
+            schema_data = yaml.load(schema_yaml, Loader=_YamlLoader)
             tests_by_column = defaultdict(list)
 
             if 'models' in schema_data:
@@ -752,21 +1256,82 @@ class CodeCoverageAnalyzer:
                                     if isinstance(test, str):
                                         tests_by_column[col_name].append(test)
                                     elif isinstance(test, dict):
-                                        test_name = list(test.keys())[0]
-                                        tests_by_column[col_name].append(test_name)
+                                        tests_by_column[col_name].append(next(iter(test)))
 
-            return dict(tests_by_column)
+            tests_by_column.default_factory = None
+            return tests_by_column
         except:
             return {}
 
     @staticmethod
-    def analyze_coverage(models: List[Dict], generated_tests: Dict) -> Dict:
-        coverage_report = {
+    @lru_cache(maxsize=None)
+    def _test_bucket(test_name: str) -> str:
+        """Summary bucket for a test name; first matching keyword wins, as dbt_utils variants embed them"""
+        lowered = test_name.lower()
+        return next(
+            (bucket for keyword, bucket in CodeCoverageAnalyzer._TEST_BUCKETS.items() if keyword in lowered),
+            'custom_tests'
+        )
+
+    @staticmethod
+    def coverage_band(coverage_pct: float) -> str:
+        """Status band for a coverage percentage: success, warning, or danger below MIN_COVERAGE"""
+        if coverage_pct >= CodeCoverageAnalyzer.GOOD_COVERAGE:
+            return 'success'
+        if coverage_pct >= CodeCoverageAnalyzer.MIN_COVERAGE:
+            return 'warning'
+        return 'danger'
+
+    @staticmethod
+    def _analyze_model(model: Dict, model_tests: Dict) -> ModelCoverage:
+        columns = CodeCoverageAnalyzer.extract_columns_from_model(model.get('content', ''))
+
+        tested_in, untested = [], []
+        for c in columns:
+            (tested_in if c in model_tests else untested).append(c)
+
+        return {
+            'name': model['name'],
+            'total_columns': len(columns),
+            'tested_columns': len(tested_in),
+            'coverage_percentage': (len(tested_in) / len(columns) * 100) if columns else 0,
+            'columns': columns,
+            'tested_columns_list': list(model_tests.keys()),
+            'untested_columns': untested,
+            'tests': model_tests
+        }
+
+    @staticmethod
+    def analyze_coverage(models: List[Dict], generated_tests: Dict) -> CoverageReport:
+        """Coverage of the models against the generated schema tests.
+
+        Cached on each model's content hash (computed once at load time) rather than its SQL,
+        and on the only two generated fields the analysis reads.
+        """
+        models_key = tuple(
+            (model['name'], model.get('content_hash') or _content_hash(model['content']))
+            for model in models
+        )
+        return CodeCoverageAnalyzer._analyze_coverage(
+            models_key,
+            generated_tests.get('model_name'),
+            generated_tests.get('schema', ''),
+            models
+        )
+
+    @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=32)
+    def _analyze_coverage(models_key: Tuple[Tuple[str, str], ...], target_model: Optional[str],
+                          target_schema: str, _models: List[Dict]) -> CoverageReport:
+        models = _models
+        coverage_report: CoverageReport = {
             'total_models': len(models),
             'models_with_tests': 0,
             'total_columns': 0,
             'columns_with_tests': 0,
+            'total_untested_columns': 0,
             'coverage_percentage': 0.0,
+            'coverage_band': 'danger',
             'models_detail': [],
             'summary': {
                 'unique_tests': 0,
@@ -774,73 +1339,52 @@ class CodeCoverageAnalyzer:
                 'accepted_values_tests': 0,
                 'relationships_tests': 0,
                 'custom_tests': 0
-            }
+            },
+            'total_tests': 0,
+            # Identifies this analysis run, so per-report render work can be cached against it
+            'generated_at': datetime.now().isoformat()
         }
 
-        for model in models:
-            model_name = model['name']
-            model_sql = model.get('content', '')
-
-            columns = CodeCoverageAnalyzer.extract_columns_from_model(model_sql)
-            coverage_report['total_columns'] += len(columns)
+        target_tests = CodeCoverageAnalyzer.extract_tests_from_schema(target_schema) if target_model else {}
 
-            model_tests = {}
-            if model_name == generated_tests.get('model_name'):
-                model_tests = CodeCoverageAnalyzer.extract_tests_from_schema(
-                    generated_tests.get('schema', '')
-                )
+        details = coverage_report['models_detail']
+        for model in models:
+            details.append(CodeCoverageAnalyzer._analyze_model(
+                model, target_tests if model['name'] == target_model else {}
+            ))
+
+        coverage_report['total_columns'] = sum(d['total_columns'] for d in details)
+        coverage_report['columns_with_tests'] = sum(d['tested_columns'] for d in details)
+        coverage_report['models_with_tests'] = sum(1 for d in details if d['tests'])
+        test_counts = Counter(
+            CodeCoverageAnalyzer._test_bucket(test)
+            for d in details for tests in d['tests'].values() for test in tests
+        )
+        coverage_report['summary'].update(test_counts)
+        coverage_report['total_tests'] = sum(test_counts.values())
 
-            tested_columns = len([c for c in columns if c in model_tests])
-            coverage_report['columns_with_tests'] += tested_columns
-
-            model_coverage = (tested_columns / len(columns) * 100) if columns else 0
-
-            if model_tests:
-                coverage_report['models_with_tests'] += 1
-
-            for col, tests in model_tests.items():
-                for test in tests:
-                    if 'unique' in test.lower():
-                        coverage_report['summary']['unique_tests'] += 1
-                    elif 'not_null' in test.lower():
-                        coverage_report['summary']['not_null_tests'] += 1
-                    elif 'accepted_values' in test.lower():
-                        coverage_report['summary']['accepted_values_tests'] += 1
-                    elif 'relationships' in test.lower():
-                        coverage_report['summary']['relationships_tests'] += 1
-                    else:
-                        coverage_report['summary']['custom_tests'] += 1
-
-            coverage_report['models_detail'].append({
-                'name': model_name,
-                'total_columns': len(columns),
-                'tested_columns': tested_columns,
-                'coverage_percentage': model_coverage,
-                'columns': columns,
-                'tested_columns_list': list(model_tests.keys()),
-                'untested_columns': [c for c in columns if c not in model_tests],
-                'tests': model_tests
-            })
+        coverage_report['total_untested_columns'] = (
+                coverage_report['total_columns'] - coverage_report['columns_with_tests']
+        )
 
         if coverage_report['total_columns'] > 0:
             coverage_report['coverage_percentage'] = (
                     coverage_report['columns_with_tests'] /
                     coverage_report['total_columns'] * 100
             )
+        coverage_report['coverage_band'] = CodeCoverageAnalyzer.coverage_band(
+            coverage_report['coverage_percentage']
+        )
 
         return coverage_report
 
     @staticmethod
-    def generate_coverage_html(coverage_report: Dict) -> str:
+    def generate_coverage_html(coverage_report: CoverageReport) -> str:
         coverage_pct = coverage_report['coverage_percentage']
-        if coverage_pct >= 80:
-            coverage_color = '#4CAF50'
-        elif coverage_pct >= 60:
-            coverage_color = '#FF9800'
-        else:
-            coverage_color = '#F44336'
+        coverage_color = CodeCoverageAnalyzer._BAND_COLORS[coverage_report['coverage_band']]
+        generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        html = f"""<!DOCTYPE html>
+        html = [f"""<!DOCTYPE html>
 <html>
 <head>
     <title>DBT Test Coverage Report</title>
@@ -861,7 +1405,7 @@ class CodeCoverageAnalyzer:
 <body>
     <div class="header">
         <h1>🧪 DBT Test Coverage Report</h1>
-        <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+        <p>Generated: {generated_at}</p>
     </div>
     <div class="coverage-bar">
         <div class="coverage-fill" style="width: {coverage_pct}%">{coverage_pct:.1f}% Coverage</div>
@@ -872,28 +1416,507 @@ class CodeCoverageAnalyzer:
         <div class="metric-card"><div class="metric-value">{coverage_report['total_columns']}</div><div>Total Columns</div></div>
         <div class="metric-card"><div class="metric-value">{coverage_report['columns_with_tests']}</div><div>Tested Columns</div></div>
     </div>
-"""
+"""]
 
+        model_html = CodeCoverageAnalyzer._MODEL_HTML.format
+        tested_span = CodeCoverageAnalyzer._TESTED_COLUMN_HTML.format
+        untested_span = CodeCoverageAnalyzer._UNTESTED_COLUMN_HTML.format
         for model in coverage_report['models_detail']:
-            html += f"""<div class="model-detail">
-        <h3>📄 {model['name']} - {model['coverage_percentage']:.1f}%</h3>
-        <p><strong>{model['tested_columns']}</strong> of <strong>{model['total_columns']}</strong> columns tested</p>
-        <div>"""
+            tested = set(model['tested_columns_list'])
+            html.append(model_html(
+                name=html_escape(model['name']),
+                coverage=model['coverage_percentage'],
+                tested_columns=model['tested_columns'],
+                total_columns=model['total_columns'],
+                columns=''.join(
+                    tested_span(col=html_escape(col)) if col in tested else untested_span(col=html_escape(col))
+                    for col in model['columns']
+                )
+            ))
 
-            for col in model['columns']:
-                is_tested = col in model['tested_columns_list']
-                css_class = 'tested' if is_tested else 'untested'
-                icon = '✓' if is_tested else '✗'
-                html += f'<span class="column {css_class}">{icon} {col}</span>'
+        html.append("</body></html>")
+        return ''.join(html)
 
-            html += "</div></div>"
+    @staticmethod
+    def generate_json_report_stream(coverage_report: CoverageReport) -> io.BytesIO:
+        """JSON report as a file-like buffer, encoded chunk by chunk rather than via one big str"""
+        if orjson is not None:
+            return io.BytesIO(orjson.dumps(coverage_report, option=orjson.OPT_INDENT_2))
+        buffer = io.BytesIO()
+        for chunk in json.JSONEncoder(indent=2).iterencode(coverage_report):
+            buffer.write(chunk.encode('utf-8'))
+        buffer.seek(0)
+        return buffer
+
+
+_STREAMED_COMPLETIONS_MAX = 32
+
+
+def _stream_completion(config: Dict, prompt: str) -> str:
+    """Stream a completion onto the page the first time a (config, prompt) pair is seen.
+
+    Streamed text bypasses the completion cache, so it is kept per request_key in session
+    state and returned without another call on repeat clicks. Only the most recently used
+    _STREAMED_COMPLETIONS_MAX are kept, so a long session does not hold every response it saw.
+    """
+    key = LLMHandler.request_key(config, prompt)
+    streamed = st.session_state.setdefault('streamed_completions', {})
+    if key in streamed:
+        # Re-insert to mark as most recently used; dicts keep insertion order
+        streamed[key] = streamed.pop(key)
+    else:
+        streamed[key] = st.write_stream(LLMHandler.stream_from_llm(config, prompt))
+        while len(streamed) > _STREAMED_COMPLETIONS_MAX:
+            del streamed[next(iter(streamed))]
+    return streamed[key]
+
+
+def _advance_llm_batch(llm_batch: Dict, config: Dict) -> bool:
+    """Poll a submitted batch. A finished Gherkin step queues the tests step; a finished
+    tests step moves the results into ai_generated.
+
+    Returns False while the batch is still running or when failures were reported on the page,
+    so the caller only reruns when there is nothing to keep on screen.
+    """
+    results = LLMHandler.batch_results(llm_batch['id'], config)
+    if results is None:
+        st.info("⏳ Batch still running - check back later")
+        return False
+
+    failed = [model['name'] for custom_id, model in llm_batch['models'].items() if custom_id not in results]
+    if failed:
+        st.error(f"❌ No batch result for: {', '.join(failed)}")
+    done = {custom_id: model for custom_id, model in llm_batch['models'].items() if custom_id in results}
+
+    if not done:
+        # Nothing came back; the error above stands on its own, with no follow-up batch or success toast
+        del st.session_state['llm_batch']
+        return False
+
+    if llm_batch['stage'] == 'gherkin':
+        st.session_state['llm_batch'] = {
+            'id': LLMHandler.submit_batch(
+                {custom_id: LLMHandler.tests_prompt(results[custom_id], model['name'])
+                 for custom_id, model in done.items()},
+                config
+            ),
+            'stage': 'tests',
+            'models': done
+        }
+        st.toast(f"📦 Gherkin ready - tests batch submitted for {len(done)} models")
+    else:
+        ai_generated = st.session_state.setdefault('ai_generated', {})
+        for custom_id, model in done.items():
+            ai_generated[model['name']] = LLMHandler.parse_tests(results[custom_id])
+        del st.session_state['llm_batch']
+        st.toast(f"✅ Batch tests ready for {len(done)} models!")
+    return not failed
+
+
+@st.fragment
+def _plain_english_panel():
+    """Plain English to Gherkin flow; edits and conversions rerun only this panel"""
+    st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+    st.markdown("#### 💬 Natural Language Input")
+    st.info("🎯 Describe your requirements in plain English - AI will convert to Gherkin!")
+
+    plain_english = st.text_area(
+        "Test Requirements",
+        value="""I need to validate a customer table that:
+- Has unique customer IDs (never null)
+- Has properly formatted email addresses
+- Has status only as 'active', 'inactive', or 'suspended'
+- Has created_at never in the future
+- Has country referencing countries table
+- Has no customers under 18 years old""",
+        height=200
+    )
 
-        html += "</body></html>"
-        return html
+    if st.button("🔮 Convert to Gherkin", use_container_width=True):
+        if 'llm_config' not in st.session_state:
+            st.error("⚠️ Please configure AI settings in sidebar")
+        elif st.session_state.get('converted_gherkin_key') == LLMHandler.request_key(
+                st.session_state['llm_config'], plain_english):
+            st.info("♻️ Requirements unchanged - showing the previous conversion")
+        else:
+            try:
+                with st.spinner("🤖 AI is analyzing your requirements..."):
+                    gherkin_output = st.write_stream(LLMHandler.plain_english_to_gherkin(
+                        plain_english,
+                        st.session_state['llm_config']
+                    ))
+                    st.session_state['converted_gherkin'] = gherkin_output
+                    st.session_state['converted_gherkin_key'] = LLMHandler.request_key(
+                        st.session_state['llm_config'], plain_english
+                    )
+                    st.toast("✅ Converted to Gherkin!")
+                    st.rerun(scope="fragment")
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
 
-    @staticmethod
-    def generate_json_report(coverage_report: Dict) -> str:
-        return json.dumps(coverage_report, indent=2)
+    if 'converted_gherkin' in st.session_state:
+        st.markdown("---")
+        st.markdown("#### 📝 Generated Gherkin")
+        edited_gherkin = st.text_area(
+            "Review & Edit",
+            value=st.session_state['converted_gherkin'],
+            height=250
+        )
+
+        model_name = st.text_input("Model Name", value="stg_customers")
+
+        col_a, col_b = st.columns(2)
+        with col_a:
+            if st.button("⚡ Generate Tests", use_container_width=True):
+                with st.spinner("Generating..."):
+                    feature = GherkinDSLParser.parse_feature(edited_gherkin)
+
+                    schema_yaml = DBTTestGenerator.generate_schema_tests(feature, model_name)
+                    unit_test = DBTTestGenerator.generate_unit_test(feature, model_name)
+                    model_sql = DBTModelGenerator.generate_model(model_name, feature, "view")
+
+                    st.session_state['generated'] = {
+                        'schema': schema_yaml,
+                        'unit_test': unit_test,
+                        'model': model_sql,
+                        'model_name': model_name
+                    }
+                    st.toast("✅ Done!")
+                    st.rerun()
+
+        with col_b:
+            if st.button("🤖 AI Generate", use_container_width=True):
+                try:
+                    with st.spinner("AI generating..."):
+                        llm_results = LLMHandler.parse_tests(_stream_completion(
+                            st.session_state['llm_config'],
+                            LLMHandler.tests_prompt(edited_gherkin, model_name)
+                        ))
+
+                        st.session_state['generated'] = {
+                            'schema': llm_results['schema'],
+                            'unit_test': llm_results['unit_test'],
+                            'model': llm_results['model'],
+                            'model_name': model_name
+                        }
+                        st.toast("✅ Done!")
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"❌ {str(e)}")
+    st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+
+@st.fragment
+def _llm_panel():
+    """Gherkin to AI-generated tests flow; typing in the spec reruns only this panel"""
+    st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+    st.markdown("#### 🤖 AI-Powered Generation")
+    st.info("🎯 Provide Gherkin specs - AI generates comprehensive tests!")
+
+    gherkin_text = st.text_area(
+        "Gherkin Specification",
+        value="""Feature: Order Processing Quality
+  Validate order data integrity
+
+Scenario: Order ID validation
+  Given an orders table with order_id
+  When we check identifiers
+  Then order_id should be unique
+  And order_id should not be null
+  And order_id should match pattern 'ORD-[0-9]+'
+
+Scenario: Order status validation
+  Given an orders table with status
+  Then status should have accepted_values ['pending', 'processing', 'completed', 'cancelled']""",
+        height=300
+    )
+
+    model_name = st.text_input("Model Name", value="stg_orders")
+
+    if st.button("🚀 Generate with AI", use_container_width=True):
+        if 'llm_config' not in st.session_state:
+            st.error("⚠️ Configure AI settings in sidebar")
+        else:
+            try:
+                with st.spinner("🤖 AI is crafting your tests..."):
+                    llm_results = LLMHandler.parse_tests(_stream_completion(
+                        st.session_state['llm_config'],
+                        LLMHandler.tests_prompt(gherkin_text, model_name)
+                    ))
+
+                    st.session_state['generated'] = {
+                        'schema': llm_results['schema'],
+                        'unit_test': llm_results['unit_test'],
+                        'model': llm_results['model'],
+                        'model_name': model_name
+                    }
+                    st.toast("✅ AI generation complete!")
+                    st.balloons()
+                    st.rerun()
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+    st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+
+@st.fragment
+def _coverage_panel():
+    """Coverage tab; downloads and expanders rerun only this panel, not the whole page"""
+    st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+
+    if st.button("🔄 Generate Coverage Report", use_container_width=True):
+        models_to_analyze = []
+
+        if 'models' in st.session_state and st.session_state['models']:
+            models_to_analyze = st.session_state['models']
+        else:
+            models_to_analyze = [{
+                'name': st.session_state['generated']['model_name'],
+                'content': st.session_state['generated']['model']
+            }]
+
+        with st.spinner("📊 Analyzing coverage..."):
+            coverage_report = CodeCoverageAnalyzer.analyze_coverage(
+                models_to_analyze,
+                st.session_state['generated']
+            )
+
+            st.session_state['coverage_report'] = coverage_report
+            st.toast("✅ Coverage analysis complete!")
+            st.rerun()
+
+    if 'coverage_report' in st.session_state:
+        report = st.session_state['coverage_report']
+
+        # Metrics
+        st.markdown(_metric_cards([
+            ("Total Models", report['total_models']),
+            ("With Tests", report['models_with_tests']),
+            ("Total Columns", report['total_columns']),
+            ("Tested Columns", report['columns_with_tests'])
+        ]), unsafe_allow_html=True)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # Coverage bar
+        coverage_pct = report['coverage_percentage']
+        coverage_band = report['coverage_band']
+        badge = f"status-{coverage_band}"
+
+        st.progress(coverage_pct / 100)
+        st.markdown(f"""
+        <div style="text-align: center; margin: 10px 0;">
+            <span class="status-badge {badge}">Coverage: {coverage_pct:.1f}%</span>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Test breakdown
+        st.markdown("#### 🔍 Test Distribution")
+        test_cols = st.columns(5)
+        test_cols[0].metric("🔑 Unique", report['summary']['unique_tests'])
+        test_cols[1].metric("✓ Not Null", report['summary']['not_null_tests'])
+        test_cols[2].metric("📋 Values", report['summary']['accepted_values_tests'])
+        test_cols[3].metric("🔗 Relations", report['summary']['relationships_tests'])
+        test_cols[4].metric("⚙️ Custom", report['summary']['custom_tests'])
+
+        # Model details
+        st.markdown("#### 📊 Model Details")
+        for model in report['models_detail']:
+            name, coverage, tested, total = (
+                model['name'], model['coverage_percentage'], model['tested_columns'], model['total_columns']
+            )
+            with st.expander(f"📄 {name} - {coverage:.1f}%"):
+                st.write(f"**{tested}/{total} columns tested**")
+
+                # One bullet list per side rather than one element per column
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.markdown("**✅ Tested:**")
+                    st.markdown('\n'.join(f"- `{col}`" for col in model['tested_columns_list']))
+
+                with col_b:
+                    st.markdown("**❌ Untested:**")
+                    st.markdown('\n'.join(f"- `{col}`" for col in model['untested_columns']))
+
+        # Export
+        st.markdown("---")
+        export_cols = st.columns(2)
+        export_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with export_cols[0]:
+            st.download_button(
+                "📄 Download HTML Report",
+                lambda: CodeCoverageAnalyzer.generate_coverage_html(report),
+                file_name=f"coverage_{export_stamp}.html",
+                mime="text/html",
+                use_container_width=True
+            )
+
+        with export_cols[1]:
+            # Serialized only when clicked, straight to bytes, so no copy sits in the session between reruns
+            st.download_button(
+                "📊 Download JSON Report",
+                lambda: CodeCoverageAnalyzer.generate_json_report_stream(report),
+                file_name=f"coverage_{export_stamp}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+
+        # Insights
+        st.markdown("---")
+        st.markdown("#### 💡 Coverage Insights")
+        if coverage_band == 'success':
+            st.success("🎉 Excellent coverage! Your models are well-tested.")
+        elif coverage_band == 'warning':
+            st.warning("⚠️ Good coverage, but room for improvement.")
+        else:
+            st.error("❗ Low coverage detected. Add more tests.")
+
+        untested_count = report['total_untested_columns']
+        if untested_count > 0:
+            st.info(f"💡 Add tests for {untested_count} untested columns to improve coverage.")
+
+    st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+
+@st.fragment
+def _generated_panel():
+    """Generated artifacts tabs; downloads rerun only this panel, not the whole page"""
+    st.markdown("---")
+    st.markdown("## 📋 Generated Artifacts")
+
+    generated = st.session_state['generated']
+    schema, unit_test, model_sql, model_name = (
+        generated['schema'], generated['unit_test'], generated['model'], generated['model_name']
+    )
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        "📄 Schema Tests",
+        "🧪 Unit Tests",
+        "📊 Model",
+        "📖 Documentation",
+        "📈 Coverage"
+    ])
+
+    with tab1:
+        st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+        st.code(schema, language='yaml')
+        st.download_button(
+            "⬇️ Download schema.yml",
+            schema,
+            file_name="schema.yml",
+            use_container_width=True
+        )
+        st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+    with tab2:
+        st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+        st.code(unit_test, language='sql')
+        st.download_button(
+            "⬇️ Download Unit Test",
+            unit_test,
+            file_name=f"test_{model_name}.sql",
+            use_container_width=True
+        )
+        st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+    with tab3:
+        st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+        st.code(model_sql, language='sql')
+        st.download_button(
+            "⬇️ Download Model",
+            model_sql,
+            file_name=f"{model_name}.sql",
+            use_container_width=True
+        )
+        st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+    with tab4:
+        st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
+        doc = f"""# {model_name}
+
+## 🎯 Overview
+Auto-generated DBT model from Gherkin specifications.
+
+## ✅ Tests Included
+- **Schema Tests**: Data quality validations
+- **Unit Tests**: Business logic validation
+
+## 🚀 Usage
+```bash
+# Run model
+dbt run --select {model_name}
+
+# Run tests
+dbt test --select {model_name}
+```
+
+## 📁 Structure
+```
+models/
+├── {model_name}.sql
+├── schema.yml
+tests/
+└── test_{model_name}.sql
+```
+
+---
+*Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*
+"""
+        st.markdown(doc)
+        st.download_button(
+            "⬇️ Download README",
+            doc,
+            file_name=f"{model_name}_README.md",
+            use_container_width=True
+        )
+        st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
+
+    with tab5:
+        _coverage_panel()
+
+
+_MODELS_PER_PAGE = 25
+
+
+_ATTENTION_CARD_HTML = """<div style="padding: 10px; margin: 5px 0; background: #fff3cd; border-left: 4px solid #ffc107; border-radius: 5px;">
+            <strong>{name}</strong>: {coverage:.1f}% 
+            ({tested_columns}/{total_columns} columns)
+        </div>"""
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _aggregate_summary(generated_at: str, _report: CoverageReport) -> Tuple[str, int, str]:
+    """Aggregate metric cards, count of models under MIN_COVERAGE and their warning cards, as ready HTML.
+
+    Keyed on the report's generated_at, so reruns with an unchanged report reuse the rendered blocks.
+    """
+    metrics_html = _metric_cards([
+        ("Models Coverage", f"{_report['models_with_tests']}/{_report['total_models']}"),
+        ("Column Coverage", f"{_report['coverage_percentage']:.1f}%"),
+        ("Total Tests", _report['total_tests'])
+    ])
+    # Filter and render in one pass; the cards themselves give the count
+    min_coverage = CodeCoverageAnalyzer.MIN_COVERAGE
+    attention_card = _ATTENTION_CARD_HTML.format
+    cards = [
+        attention_card(
+            name=html_escape(m['name']),
+            coverage=m['coverage_percentage'],
+            tested_columns=m['tested_columns'],
+            total_columns=m['total_columns']
+        )
+        for m in _report['models_detail']
+        if m['coverage_percentage'] < min_coverage
+    ]
+    return metrics_html, len(cards), ''.join(cards)
+
+
+# Baseline checks used by the per-model "Generate Tests" button; shared read-only across models
+_DEFAULT_SCENARIOS = [{
+    'name': 'Basic data quality',
+    'given': ['a model with data'],
+    'when': ['we validate the data'],
+    'then': ['all required fields should be present', 'no duplicates should exist']
+}]
 
 
 def main():
@@ -940,30 +1963,30 @@ def main():
                 endpoint = st.text_input("Endpoint", value="http://localhost:11434")
                 model = st.text_input("Model", value="llama2")
 
+            # A local server usually generates one response at a time; extra requests just queue
+            parallelism = st.slider(
+                "Parallel Requests",
+                min_value=1,
+                max_value=_LLM_MAX_IN_FLIGHT,
+                value=1 if llm_provider == "Local LLM" else _LLM_MAX_IN_FLIGHT,
+                help="Concurrent LLM calls when generating for a page of models"
+            )
+
             st.session_state['llm_config'] = {
                 'provider': llm_provider,
                 'api_key': api_key if llm_provider != "Local LLM" else None,
                 'endpoint': endpoint if llm_provider in ["Azure OpenAI", "Local LLM"] else None,
-                'model': model
+                'model': model,
+                'parallelism': parallelism
             }
 
         st.markdown("---")
         st.markdown("### 📊 Quick Stats")
-        if 'generated' in st.session_state:
-            st.success("✅ Tests Generated")
-        if 'coverage_report' in st.session_state:
-            report = st.session_state['coverage_report']
-            st.metric("Coverage", f"{report['coverage_percentage']:.1f}%")
+        # Filled at the end of main(), so actions further down the page show up without a rerun
+        quick_stats = st.container()
 
         st.markdown("---")
-        st.markdown("""
-        <div style="text-align: center; padding: 20px; background: rgba(102, 126, 234, 0.1); border-radius: 10px;">
-            <p style="margin: 0; font-size: 0.85rem; color: #667eea;">
-                <strong>DBT Test Generator Pro v2.0</strong><br>
-                Powered by AI & Gherkin DSL
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_sidebar_badge_html(), unsafe_allow_html=True)
 
     # Main Content Area
     col1, col2 = st.columns([1, 1], gap="large")
@@ -972,7 +1995,7 @@ def main():
         st.markdown("### 📥 Input Configuration")
 
         if "GitHub" in input_method:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
             st.markdown("#### 🔗 GitHub Repository")
             github_url = st.text_input(
                 "Repository URL",
@@ -986,13 +2009,13 @@ def main():
                     models = GitHubHandler.fetch_dbt_models(github_url, github_token)
                     if models:
                         st.session_state['models'] = models
-                        st.success(f"✅ Successfully loaded {len(models)} models!")
-                        time.sleep(0.5)
-                        st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
+                        st.session_state.pop('ai_generated', None)
+                        st.session_state.pop('llm_batch', None)
+                        st.toast(f"✅ Successfully loaded {len(models)} models!")
+            st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
 
         elif "Local Folder" in input_method:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
             st.markdown("#### 💾 Local Directory")
             folder_path = st.text_input(
                 "Folder Path",
@@ -1005,173 +2028,23 @@ def main():
                     path = Path(folder_path)
                     if path.exists():
                         with st.spinner("🔄 Loading models..."):
-                            sql_files = list(path.glob("*.sql"))
-                            models = []
-                            for file in sql_files:
-                                with open(file, 'r') as f:
-                                    models.append({
-                                        'name': file.stem,
-                                        'path': str(file),
-                                        'content': f.read()
-                                    })
+                            models = LocalFolderHandler.load_dbt_models(path)
                             st.session_state['models'] = models
-                            st.success(f"✅ Loaded {len(models)} models!")
-                            time.sleep(0.5)
-                            st.rerun()
+                            st.session_state.pop('ai_generated', None)
+                            st.session_state.pop('llm_batch', None)
+                            st.toast(f"✅ Loaded {len(models)} models!")
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
 
         elif "Plain English" in input_method:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 💬 Natural Language Input")
-            st.info("🎯 Describe your requirements in plain English - AI will convert to Gherkin!")
-
-            plain_english = st.text_area(
-                "Test Requirements",
-                value="""I need to validate a customer table that:
-- Has unique customer IDs (never null)
-- Has properly formatted email addresses
-- Has status only as 'active', 'inactive', or 'suspended'
-- Has created_at never in the future
-- Has country referencing countries table
-- Has no customers under 18 years old""",
-                height=200
-            )
-
-            if st.button("🔮 Convert to Gherkin", use_container_width=True):
-                if 'llm_config' not in st.session_state:
-                    st.error("⚠️ Please configure AI settings in sidebar")
-                else:
-                    try:
-                        with st.spinner("🤖 AI is analyzing your requirements..."):
-                            progress_bar = st.progress(0)
-                            for i in range(100):
-                                time.sleep(0.01)
-                                progress_bar.progress(i + 1)
-
-                            gherkin_output = LLMHandler.plain_english_to_gherkin(
-                                plain_english,
-                                st.session_state['llm_config']
-                            )
-                            st.session_state['converted_gherkin'] = gherkin_output
-                            st.success("✅ Converted to Gherkin!")
-                            time.sleep(0.5)
-                            st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
-
-            if 'converted_gherkin' in st.session_state:
-                st.markdown("---")
-                st.markdown("#### 📝 Generated Gherkin")
-                edited_gherkin = st.text_area(
-                    "Review & Edit",
-                    value=st.session_state['converted_gherkin'],
-                    height=250
-                )
-
-                model_name = st.text_input("Model Name", value="stg_customers")
-
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    if st.button("⚡ Generate Tests", use_container_width=True):
-                        with st.spinner("Generating..."):
-                            parser = GherkinDSLParser()
-                            feature = parser.parse_feature(edited_gherkin)
-
-                            schema_yaml = DBTTestGenerator.generate_schema_tests(feature, model_name)
-                            unit_test = DBTTestGenerator.generate_unit_test(feature, model_name)
-                            model_sql = DBTModelGenerator.generate_model(model_name, feature, "view")
-
-                            st.session_state['generated'] = {
-                                'schema': schema_yaml,
-                                'unit_test': unit_test,
-                                'model': model_sql,
-                                'model_name': model_name
-                            }
-                            st.success("✅ Done!")
-                            st.rerun()
-
-                with col_b:
-                    if st.button("🤖 AI Generate", use_container_width=True):
-                        try:
-                            with st.spinner("AI generating..."):
-                                llm_results = LLMHandler.gherkin_to_tests(
-                                    edited_gherkin,
-                                    model_name,
-                                    st.session_state['llm_config']
-                                )
-
-                                st.session_state['generated'] = {
-                                    'schema': llm_results['schema'],
-                                    'unit_test': llm_results['unit_test'],
-                                    'model': llm_results['model'],
-                                    'model_name': model_name
-                                }
-                                st.success("✅ Done!")
-                                st.rerun()
-                        except Exception as e:
-                            st.error(f"❌ {str(e)}")
-            st.markdown('</div>', unsafe_allow_html=True)
+            _plain_english_panel()
 
         elif "LLM-Assisted" in input_method:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.markdown("#### 🤖 AI-Powered Generation")
-            st.info("🎯 Provide Gherkin specs - AI generates comprehensive tests!")
-
-            gherkin_text = st.text_area(
-                "Gherkin Specification",
-                value="""Feature: Order Processing Quality
-  Validate order data integrity
-
-Scenario: Order ID validation
-  Given an orders table with order_id
-  When we check identifiers
-  Then order_id should be unique
-  And order_id should not be null
-  And order_id should match pattern 'ORD-[0-9]+'
-
-Scenario: Order status validation
-  Given an orders table with status
-  Then status should have accepted_values ['pending', 'processing', 'completed', 'cancelled']""",
-                height=300
-            )
-
-            model_name = st.text_input("Model Name", value="stg_orders")
-
-            if st.button("🚀 Generate with AI", use_container_width=True):
-                if 'llm_config' not in st.session_state:
-                    st.error("⚠️ Configure AI settings in sidebar")
-                else:
-                    try:
-                        with st.spinner("🤖 AI is crafting your tests..."):
-                            progress_bar = st.progress(0)
-                            for i in range(100):
-                                time.sleep(0.02)
-                                progress_bar.progress(i + 1)
-
-                            llm_results = LLMHandler.gherkin_to_tests(
-                                gherkin_text,
-                                model_name,
-                                st.session_state['llm_config']
-                            )
-
-                            st.session_state['generated'] = {
-                                'schema': llm_results['schema'],
-                                'unit_test': llm_results['unit_test'],
-                                'model': llm_results['model'],
-                                'model_name': model_name
-                            }
-                            st.success("✅ AI generation complete!")
-                            st.balloons()
-                            time.sleep(0.5)
-                            st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
-            st.markdown('</div>', unsafe_allow_html=True)
+            _llm_panel()
 
         else:  # Manual Entry
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown(_FEATURE_CARD_OPEN, unsafe_allow_html=True)
             st.markdown("#### ✍️ Manual Gherkin Entry")
 
             gherkin_text = st.text_area(
@@ -1204,13 +2077,7 @@ Scenario: Status values
 
             if st.button("⚡ Generate Tests & Models", use_container_width=True):
                 with st.spinner("⚙️ Generating..."):
-                    progress_bar = st.progress(0)
-                    for i in range(100):
-                        time.sleep(0.01)
-                        progress_bar.progress(i + 1)
-
-                    parser = GherkinDSLParser()
-                    feature = parser.parse_feature(gherkin_text)
+                    feature = GherkinDSLParser.parse_feature(gherkin_text)
 
                     schema_yaml = DBTTestGenerator.generate_schema_tests(feature, model_name)
                     unit_test = DBTTestGenerator.generate_unit_test(feature, model_name)
@@ -1222,9 +2089,8 @@ Scenario: Status values
                         'model': model_sql,
                         'model_name': model_name
                     }
-                    st.success("✅ Generation complete!")
-                    st.rerun()
-            st.markdown('</div>', unsafe_allow_html=True)
+                    st.toast("✅ Generation complete!")
+            st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
 
     with col2:
         st.markdown("### 💡 Quick Tips")
@@ -1274,261 +2140,35 @@ Scenario: Status values
                 <h4>📊 Models Loaded</h4>
             """, unsafe_allow_html=True)
             st.metric("Total Models", len(st.session_state['models']))
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(_FEATURE_CARD_CLOSE, unsafe_allow_html=True)
 
     # Generated Outputs Section
     if 'generated' in st.session_state:
-        st.markdown("---")
-        st.markdown("## 📋 Generated Artifacts")
-
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
-            "📄 Schema Tests",
-            "🧪 Unit Tests",
-            "📊 Model",
-            "📖 Documentation",
-            "📈 Coverage"
-        ])
-
-        with tab1:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.code(st.session_state['generated']['schema'], language='yaml')
-            st.download_button(
-                "⬇️ Download schema.yml",
-                st.session_state['generated']['schema'],
-                file_name="schema.yml",
-                use_container_width=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with tab2:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.code(st.session_state['generated']['unit_test'], language='sql')
-            st.download_button(
-                "⬇️ Download Unit Test",
-                st.session_state['generated']['unit_test'],
-                file_name=f"test_{st.session_state['generated']['model_name']}.sql",
-                use_container_width=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with tab3:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            st.code(st.session_state['generated']['model'], language='sql')
-            st.download_button(
-                "⬇️ Download Model",
-                st.session_state['generated']['model'],
-                file_name=f"{st.session_state['generated']['model_name']}.sql",
-                use_container_width=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with tab4:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-            doc = f"""# {st.session_state['generated']['model_name']}
-
-## 🎯 Overview
-Auto-generated DBT model from Gherkin specifications.
-
-## ✅ Tests Included
-- **Schema Tests**: Data quality validations
-- **Unit Tests**: Business logic validation
-
-## 🚀 Usage
-```bash
-# Run model
-dbt run --select {st.session_state['generated']['model_name']}
-
-# Run tests
-dbt test --select {st.session_state['generated']['model_name']}
-```
-
-## 📁 Structure
-```
-models/
-├── {st.session_state['generated']['model_name']}.sql
-├── schema.yml
-tests/
-└── test_{st.session_state['generated']['model_name']}.sql
-```
-
----
-*Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*
-"""
-            st.markdown(doc)
-            st.download_button(
-                "⬇️ Download README",
-                doc,
-                file_name=f"{st.session_state['generated']['model_name']}_README.md",
-                use_container_width=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with tab5:
-            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-
-            if st.button("🔄 Generate Coverage Report", use_container_width=True):
-                models_to_analyze = []
-
-                if 'models' in st.session_state and st.session_state['models']:
-                    models_to_analyze = st.session_state['models']
-                else:
-                    models_to_analyze = [{
-                        'name': st.session_state['generated']['model_name'],
-                        'content': st.session_state['generated']['model']
-                    }]
-
-                with st.spinner("📊 Analyzing coverage..."):
-                    progress_bar = st.progress(0)
-                    for i in range(100):
-                        time.sleep(0.01)
-                        progress_bar.progress(i + 1)
-
-                    coverage_report = CodeCoverageAnalyzer.analyze_coverage(
-                        models_to_analyze,
-                        st.session_state['generated']
-                    )
-
-                    st.session_state['coverage_report'] = coverage_report
-                    st.success("✅ Coverage analysis complete!")
-                    st.rerun()
-
-            if 'coverage_report' in st.session_state:
-                report = st.session_state['coverage_report']
-
-                # Metrics
-                metric_cols = st.columns(4)
-                with metric_cols[0]:
-                    st.markdown("""
-                    <div class="metric-card">
-                        <div class="metric-label">Total Models</div>
-                        <div class="metric-value">{}</div>
-                    </div>
-                    """.format(report['total_models']), unsafe_allow_html=True)
-
-                with metric_cols[1]:
-                    st.markdown("""
-                    <div class="metric-card">
-                        <div class="metric-label">With Tests</div>
-                        <div class="metric-value">{}</div>
-                    </div>
-                    """.format(report['models_with_tests']), unsafe_allow_html=True)
-
-                with metric_cols[2]:
-                    st.markdown("""
-                    <div class="metric-card">
-                        <div class="metric-label">Total Columns</div>
-                        <div class="metric-value">{}</div>
-                    </div>
-                    """.format(report['total_columns']), unsafe_allow_html=True)
-
-                with metric_cols[3]:
-                    st.markdown("""
-                    <div class="metric-card">
-                        <div class="metric-label">Tested Columns</div>
-                        <div class="metric-value">{}</div>
-                    </div>
-                    """.format(report['columns_with_tests']), unsafe_allow_html=True)
-
-                st.markdown("<br>", unsafe_allow_html=True)
-
-                # Coverage bar
-                coverage_pct = report['coverage_percentage']
-                if coverage_pct >= 80:
-                    color = "green"
-                    badge = "status-success"
-                elif coverage_pct >= 60:
-                    color = "orange"
-                    badge = "status-warning"
-                else:
-                    color = "red"
-                    badge = "status-danger"
-
-                st.progress(coverage_pct / 100)
-                st.markdown(f"""
-                <div style="text-align: center; margin: 10px 0;">
-                    <span class="status-badge {badge}">Coverage: {coverage_pct:.1f}%</span>
-                </div>
-                """, unsafe_allow_html=True)
-
-                # Test breakdown
-                st.markdown("#### 🔍 Test Distribution")
-                test_cols = st.columns(5)
-                test_cols[0].metric("🔑 Unique", report['summary']['unique_tests'])
-                test_cols[1].metric("✓ Not Null", report['summary']['not_null_tests'])
-                test_cols[2].metric("📋 Values", report['summary']['accepted_values_tests'])
-                test_cols[3].metric("🔗 Relations", report['summary']['relationships_tests'])
-                test_cols[4].metric("⚙️ Custom", report['summary']['custom_tests'])
-
-                # Model details
-                st.markdown("#### 📊 Model Details")
-                for model in report['models_detail']:
-                    with st.expander(f"📄 {model['name']} - {model['coverage_percentage']:.1f}%"):
-                        st.write(f"**{model['tested_columns']}/{model['total_columns']} columns tested**")
-
-                        col_a, col_b = st.columns(2)
-                        with col_a:
-                            st.markdown("**✅ Tested:**")
-                            for col in model['tested_columns_list']:
-                                st.markdown(f"- `{col}`")
-
-                        with col_b:
-                            st.markdown("**❌ Untested:**")
-                            for col in model['untested_columns']:
-                                st.markdown(f"- `{col}`")
-
-                # Export
-                st.markdown("---")
-                export_cols = st.columns(2)
-                with export_cols[0]:
-                    html_report = CodeCoverageAnalyzer.generate_coverage_html(report)
-                    st.download_button(
-                        "📄 Download HTML Report",
-                        html_report,
-                        file_name=f"coverage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html",
-                        mime="text/html",
-                        use_container_width=True
-                    )
-
-                with export_cols[1]:
-                    json_report = CodeCoverageAnalyzer.generate_json_report(report)
-                    st.download_button(
-                        "📊 Download JSON Report",
-                        json_report,
-                        file_name=f"coverage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json",
-                        use_container_width=True
-                    )
-
-                # Insights
-                st.markdown("---")
-                st.markdown("#### 💡 Coverage Insights")
-                if coverage_pct >= 80:
-                    st.success("🎉 Excellent coverage! Your models are well-tested.")
-                elif coverage_pct >= 60:
-                    st.warning("⚠️ Good coverage, but room for improvement.")
-                else:
-                    st.error("❗ Low coverage detected. Add more tests.")
-
-                untested_count = sum(len(m['untested_columns']) for m in report['models_detail'])
-                if untested_count > 0:
-                    st.info(f"💡 Add tests for {untested_count} untested columns to improve coverage.")
-
-            st.markdown('</div>', unsafe_allow_html=True)
+        _generated_panel()
 
     # Loaded Models Section
     if 'models' in st.session_state and st.session_state['models']:
         st.markdown("---")
         st.markdown("## 🗂️ Loaded Models")
 
+        # Only one page of expanders is built per rerun; collapsed expanders still ship their SQL
+        models = st.session_state['models']
+        page_count = (len(models) + _MODELS_PER_PAGE - 1) // _MODELS_PER_PAGE
+        if st.session_state.get('models_page', 1) > page_count:
+            st.session_state['models_page'] = page_count
         col_batch1, col_batch2 = st.columns([2, 1])
+        with col_batch2:
+            page = st.number_input(
+                f"Page (of {page_count})",
+                min_value=1,
+                max_value=page_count,
+                key='models_page'
+            ) if page_count > 1 else 1
+        first = (page - 1) * _MODELS_PER_PAGE
+
         with col_batch1:
             if st.button("📊 Analyze All Models Coverage", use_container_width=True):
                 with st.spinner("🔄 Analyzing all models..."):
-                    progress_bar = st.progress(0)
-                    for i in range(100):
-                        time.sleep(0.02)
-                        progress_bar.progress(i + 1)
-
                     generated_tests = st.session_state.get('generated', {})
                     coverage_report = CodeCoverageAnalyzer.analyze_coverage(
                         st.session_state['models'],
@@ -1536,13 +2176,59 @@ tests/
                     )
 
                     st.session_state['coverage_report'] = coverage_report
-                    st.success(f"✅ Analyzed {coverage_report['total_models']} models!")
+                    st.toast(f"✅ Analyzed {coverage_report['total_models']} models!")
                     st.balloons()
-                    time.sleep(0.5)
                     st.rerun()
 
+            if 'llm_config' in st.session_state:
+                if st.button("🤖 AI Generate This Page", use_container_width=True):
+                    page_models = models[first:first + _MODELS_PER_PAGE]
+                    with st.spinner(f"🤖 AI generating for {len(page_models)} models..."):
+                        results = LLMHandler.generate_for_models(page_models, st.session_state['llm_config'])
+
+                    ai_generated = st.session_state.setdefault('ai_generated', {})
+                    for name, result in results.items():
+                        if isinstance(result, Exception):
+                            st.error(f"❌ {name}: {str(result)}")
+                        else:
+                            ai_generated[name] = result
+                    st.toast(f"✅ AI tests ready for {len(results)} models!")
+
+            if 'llm_config' in st.session_state and \
+                    st.session_state['llm_config']['provider'] in LLMHandler.BATCH_PROVIDERS:
+                llm_batch = st.session_state.get('llm_batch')
+                if llm_batch is None:
+                    if st.button(
+                            "📦 Submit This Page as Batch",
+                            use_container_width=True,
+                            help="Provider Batch API: about half the cost, results within 24 hours"
+                    ):
+                        page_models = models[first:first + _MODELS_PER_PAGE]
+                        try:
+                            batch_models = {f"model-{i}": model for i, model in enumerate(page_models)}
+                            batch_id = LLMHandler.submit_batch(
+                                {custom_id: LLMHandler.model_gherkin_prompt(model)
+                                 for custom_id, model in batch_models.items()},
+                                st.session_state['llm_config']
+                            )
+                            st.session_state['llm_batch'] = {'id': batch_id, 'stage': 'gherkin', 'models': batch_models}
+                            st.toast(f"📦 Batch submitted for {len(page_models)} models")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"❌ Error: {str(e)}")
+                else:
+                    st.info(f"📦 Batch `{llm_batch['id']}` running: {llm_batch['stage']} step, "
+                            f"{len(llm_batch['models'])} models")
+                    if st.button("🔄 Check Batch Status", use_container_width=True):
+                        try:
+                            if _advance_llm_batch(llm_batch, st.session_state['llm_config']):
+                                st.rerun()
+                        except Exception as e:
+                            st.error(f"❌ Error: {str(e)}")
+
+
         # Display models in a grid
-        for idx, model in enumerate(st.session_state['models']):
+        for idx, model in enumerate(models[first:first + _MODELS_PER_PAGE], start=first):
             with st.expander(f"📄 {model['name']}", expanded=False):
                 st.code(model['content'], language='sql')
 
@@ -1553,12 +2239,7 @@ tests/
                         with st.spinner(f"Generating tests for {model['name']}..."):
                             feature = {
                                 'name': f"{model['name']} quality checks",
-                                'scenarios': [{
-                                    'name': 'Basic data quality',
-                                    'given': ['a model with data'],
-                                    'when': ['we validate the data'],
-                                    'then': ['all required fields should be present', 'no duplicates should exist']
-                                }]
+                                'scenarios': _DEFAULT_SCENARIOS
                             }
 
                             schema_yaml = DBTTestGenerator.generate_schema_tests(feature, model['name'])
@@ -1570,7 +2251,7 @@ tests/
                                 'model': model['content'],
                                 'model_name': model['name']
                             }
-                            st.success(f"✅ Tests generated for {model['name']}!")
+                            st.toast(f"✅ Tests generated for {model['name']}!")
                             st.rerun()
 
                 with btn_col2:
@@ -1578,24 +2259,12 @@ tests/
                         if st.button(f"🤖 AI Generate", key=f"llm_{idx}", use_container_width=True):
                             try:
                                 with st.spinner(f"🤖 AI generating for {model['name']}..."):
-                                    prompt = f"""Analyze this DBT model and create comprehensive Gherkin tests:
-
-Model: {model['name']}
-SQL:
-{model['content']}
-
-Generate Gherkin covering data quality, business logic, relationships, and validations."""
-
-                                    gherkin_spec = LLMHandler.generate_from_llm(
-                                        st.session_state['llm_config'],
-                                        prompt
-                                    )
-
-                                    llm_results = LLMHandler.gherkin_to_tests(
-                                        gherkin_spec,
-                                        model['name'],
-                                        st.session_state['llm_config']
-                                    )
+                                    config = st.session_state['llm_config']
+                                    gherkin_spec = _stream_completion(config, LLMHandler.model_gherkin_prompt(model))
+                                    llm_results = LLMHandler.parse_tests(_stream_completion(
+                                        config,
+                                        LLMHandler.tests_prompt(gherkin_spec, model['name'])
+                                    ))
 
                                     st.session_state['generated'] = {
                                         'schema': llm_results['schema'],
@@ -1603,11 +2272,22 @@ Generate Gherkin covering data quality, business logic, relationships, and valid
                                         'model': model['content'],
                                         'model_name': model['name']
                                     }
-                                    st.success(f"✅ AI tests for {model['name']}!")
+                                    st.toast(f"✅ AI tests for {model['name']}!")
                                     st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Error: {str(e)}")
 
+                if model['name'] in st.session_state.get('ai_generated', {}):
+                    if st.button("📋 Show AI Tests", key=f"show_{idx}", use_container_width=True):
+                        llm_results = st.session_state['ai_generated'][model['name']]
+                        st.session_state['generated'] = {
+                            'schema': llm_results['schema'],
+                            'unit_test': llm_results['unit_test'],
+                            'model': model['content'],
+                            'model_name': model['name']
+                        }
+                        st.rerun()
+
         # Aggregate coverage summary
         if 'coverage_report' in st.session_state:
             st.markdown("---")
@@ -1615,61 +2295,27 @@ Generate Gherkin covering data quality, business logic, relationships, and valid
 
             report = st.session_state['coverage_report']
 
-            summary_cols = st.columns(3)
-            with summary_cols[0]:
-                st.markdown("""
-                <div class="metric-card">
-                    <div class="metric-label">Models Coverage</div>
-                    <div class="metric-value">{}/{}</div>
-                </div>
-                """.format(report['models_with_tests'], report['total_models']), unsafe_allow_html=True)
-
-            with summary_cols[1]:
-                st.markdown("""
-                <div class="metric-card">
-                    <div class="metric-label">Column Coverage</div>
-                    <div class="metric-value">{:.1f}%</div>
-                </div>
-                """.format(report['coverage_percentage']), unsafe_allow_html=True)
-
-            with summary_cols[2]:
-                total_tests = sum(report['summary'].values())
-                st.markdown("""
-                <div class="metric-card">
-                    <div class="metric-label">Total Tests</div>
-                    <div class="metric-value">{}</div>
-                </div>
-                """.format(total_tests), unsafe_allow_html=True)
+            metrics_html, needing_count, needing_html = _aggregate_summary(report['generated_at'], report)
+            st.markdown(metrics_html, unsafe_allow_html=True)
 
             # Models needing attention
-            models_needing_tests = [
-                m for m in report['models_detail']
-                if m['coverage_percentage'] < 60
-            ]
-
-            if models_needing_tests:
-                st.warning(f"⚠️ {len(models_needing_tests)} models have <60% coverage")
+            if needing_count:
+                st.warning(f"⚠️ {needing_count} models have <{CodeCoverageAnalyzer.MIN_COVERAGE}% coverage")
                 with st.expander("🔍 View models needing attention"):
-                    for model in models_needing_tests:
-                        st.markdown(f"""
-                        <div style="padding: 10px; margin: 5px 0; background: #fff3cd; border-left: 4px solid #ffc107; border-radius: 5px;">
-                            <strong>{model['name']}</strong>: {model['coverage_percentage']:.1f}% 
-                            ({model['tested_columns']}/{model['total_columns']} columns)
-                        </div>
-                        """, unsafe_allow_html=True)
+                    st.markdown(needing_html, unsafe_allow_html=True)
             else:
                 st.success("✅ All models have good test coverage!")
 
+    with quick_stats:
+        if 'generated' in st.session_state:
+            st.success("✅ Tests Generated")
+        if 'coverage_report' in st.session_state:
+            report = st.session_state['coverage_report']
+            st.metric("Coverage", f"{report['coverage_percentage']:.1f}%")
+
     # Footer
     st.markdown("---")
-    st.markdown("""
-    <div style="text-align: center; padding: 30px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 15px; margin-top: 50px;">
-        <h3 style="color: white; margin: 0;">🚀 Ready to Transform Your DBT Testing?</h3>
-        <p style="color: rgba(255,255,255,0.9); margin: 10px 0 0 0;">
-            Generate comprehensive tests in seconds with AI-powered automation
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_footer_html(), unsafe_allow_html=True)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,5 @@
 import streamlit as st
 import os
-import yaml
 import json
 import requests
 from pathlib import Path
@@ -9,19 +8,29 @@ import tempfile
 import shutil
 import re
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, defaultdict
 import time
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import subprocess
+import shlex
+import atexit
 import sys
 import zipfile
 import io
+import queue
+import weakref
+from contextlib import contextmanager, nullcontext
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Snowflake connector
 try:
     import snowflake.connector
-    from snowflake.connector import DictCursor
+    from snowflake.connector.errors import NotSupportedError
 
     SNOWFLAKE_AVAILABLE = True
 except ImportError:
@@ -29,8 +38,9 @@ except ImportError:
 
 
 # Configure logging
-def setup_logging():
-    """Setup comprehensive logging system"""
+@st.cache_resource(show_spinner=False)
+def _log_listener() -> QueueListener:
+    """Start the thread that writes log records to file and console, once per process"""
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
 
@@ -52,11 +62,24 @@ def setup_logging():
     console_handler.setLevel(logging.ERROR)
     console_handler.setFormatter(formatter)
 
+    listener = QueueListener(queue.Queue(-1), file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def setup_logging():
+    """Setup comprehensive logging system
+
+    Records are handed to a queue and written by a background listener, so
+    logging never blocks the script on file or console I/O.
+    """
+    listener = _log_listener()
+
     logger = logging.getLogger()
     logger.setLevel(logging.ERROR)
     logger.handlers.clear()
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(QueueHandler(listener.queue))
 
     return logger
 
@@ -71,8 +94,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
+@st.cache_resource
+def _custom_css() -> str:
+    """Custom CSS for the app, built once per server process"""
+    return """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
 
@@ -168,22 +193,40 @@ st.markdown("""
         to { opacity: 1; transform: translateY(0); }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 
-class SnowflakeConnection:
-    """Handle Snowflake database connections"""
+st.markdown(_custom_css(), unsafe_allow_html=True)
 
-    def __init__(self, config: Dict):
+
+# Idle sessions older than this are closed instead of reused
+_SNOWFLAKE_MAX_IDLE_SECONDS = 600
+
+
+def _close_idle(idle: queue.Queue):
+    while True:
+        try:
+            connection, _ = idle.get_nowait()
+        except queue.Empty:
+            return
+        connection.close()
+
+
+class SnowflakePool:
+    """Keep live Snowflake sessions around so reruns don't pay a fresh login"""
+
+    def __init__(self, config: Dict, pool_size: int = 4):
         self.config = config
-        self.connection = None
-        logger.info("SnowflakeConnection initialized")
+        self._idle = queue.Queue(maxsize=pool_size)
+        # Runs once: on close(), when the pool is evicted from the cache and collected, or at exit
+        self.close = weakref.finalize(self, _close_idle, self._idle)
+        logger.info("SnowflakePool initialized")
 
-    def connect(self) -> bool:
+    def _connect(self):
         try:
             logger.info(f"Connecting to Snowflake account: {self.config.get('account')}")
 
-            self.connection = snowflake.connector.connect(
+            connection = snowflake.connector.connect(
                 user=self.config['user'],
                 password=self.config['password'],
                 account=self.config['account'],
@@ -194,21 +237,128 @@ class SnowflakeConnection:
             )
 
             logger.info("Successfully connected to Snowflake")
-            return True
+            return connection
 
         except Exception as e:
             logger.error(f"Failed to connect to Snowflake: {str(e)}", exc_info=True)
             raise Exception(f"Snowflake connection error: {str(e)}")
 
-    def execute_query(self, query: str) -> List[Dict]:
+    def acquire(self):
+        while True:
+            try:
+                connection, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - released_at > _SNOWFLAKE_MAX_IDLE_SECONDS:
+                connection.close()
+            elif not connection.is_closed():
+                return connection
+
+    def release(self, connection):
+        if connection.is_closed():
+            return
+        try:
+            self._idle.put_nowait((connection, time.monotonic()))
+        except queue.Full:
+            connection.close()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
         try:
-            logger.debug(f"Executing query: {query[:100]}...")
+            yield connection
+        finally:
+            self.release(connection)
 
-            cursor = self.connection.cursor(DictCursor)
+
+@st.cache_resource(show_spinner=False, max_entries=8, ttl=3600)
+def _snowflake_pool(account: str, user: str, password: str, warehouse: Optional[str],
+                    database: Optional[str], schema: Optional[str], role: Optional[str]) -> SnowflakePool:
+    return SnowflakePool({
+        'account': account,
+        'user': user,
+        'password': password,
+        'warehouse': warehouse,
+        'database': database,
+        'schema': schema,
+        'role': role
+    })
+
+
+class SnowflakeConnection:
+    """Handle Snowflake database connections"""
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.connection = None
+        self.pool = _snowflake_pool(
+            config['account'], config['user'], config['password'], config.get('warehouse'),
+            config.get('database'), config.get('schema'), config.get('role')
+        )
+        logger.info("SnowflakeConnection initialized")
+
+    def acquire(self) -> bool:
+        if self.connection is None:
+            self.connection = self.pool.acquire()
+        return True
+
+    def release(self):
+        if self.connection:
+            self.pool.release(self.connection)
+            self.connection = None
+            logger.info("Snowflake connection returned to pool")
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def execute_query_stream(self, query: str, columns: Optional[List[str]] = None,
+                             batch_size: int = 1000):
+        """Yield result rows in batches instead of materializing the whole result set.
+
+        Arrow result sets are streamed with fetch_arrow_batches; metadata commands
+        (SHOW/DESCRIBE) come back as JSON and fall back to fetchmany. When
+        ``columns`` is given only those fields are turned into Python objects.
+        """
+        logger.debug("Executing query: %.100s...", query)
+
+        if self.connection is None:
+            with self.pool.connection() as connection:
+                yield from self._stream(connection, query, columns, batch_size)
+        else:
+            yield from self._stream(self.connection, query, columns, batch_size)
+
+    @staticmethod
+    def _stream(connection, query: str, columns: Optional[List[str]], batch_size: int):
+        cursor = connection.cursor()
+        try:
             cursor.execute(query)
-            results = cursor.fetchall()
+            names = [desc[0] for desc in cursor.description]
+            wanted = columns or names
+
+            try:
+                for table in cursor.fetch_arrow_batches():
+                    yield table.select(wanted).to_pylist()
+                return
+            except NotSupportedError:
+                pass
+
+            indexes = [(name, names.index(name)) for name in wanted]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [{name: row[i] for name, i in indexes} for row in rows]
+        finally:
             cursor.close()
 
+    def execute_query(self, query: str, columns: Optional[List[str]] = None) -> List[Dict]:
+        try:
+            results = [row for batch in self.execute_query_stream(query, columns) for row in batch]
+
             logger.info(f"Query executed successfully, returned {len(results)} rows")
             return results
 
@@ -218,18 +368,19 @@ class SnowflakeConnection:
 
     def test_connection(self) -> Dict:
         try:
-            result = self.execute_query(
-                "SELECT CURRENT_VERSION(), CURRENT_WAREHOUSE(), CURRENT_DATABASE(), CURRENT_SCHEMA()")
-
-            if result:
+            # The login response already carries the session context, so no query is needed
+            held = nullcontext(self.connection) if self.connection else self.pool.connection()
+            with held as connection:
                 info = {
-                    'version': result[0].get('CURRENT_VERSION()'),
-                    'warehouse': result[0].get('CURRENT_WAREHOUSE()'),
-                    'database': result[0].get('CURRENT_DATABASE()'),
-                    'schema': result[0].get('CURRENT_SCHEMA()')
+                    'host': connection.host,
+                    'session_id': connection.session_id,
+                    'warehouse': connection.warehouse,
+                    'database': connection.database,
+                    'schema': connection.schema,
+                    'role': connection.role
                 }
-                logger.info(f"Connection test successful: {info}")
-                return info
+            logger.info(f"Connection test successful: {info}")
+            return info
 
         except Exception as e:
             logger.error(f"Connection test failed: {str(e)}")
@@ -237,9 +388,8 @@ class SnowflakeConnection:
 
     def get_tables(self) -> List[str]:
         try:
-            query = "SHOW TABLES"
-            results = self.execute_query(query)
-            tables = [row['name'] for row in results]
+            tables = _fetch_tables(self.config['account'], self.config['user'], self.config.get('role'),
+                                   self.config.get('database'), self.config.get('schema'), self)
             logger.info(f"Retrieved {len(tables)} tables from schema")
             return tables
 
@@ -249,8 +399,8 @@ class SnowflakeConnection:
 
     def get_table_columns(self, table_name: str) -> List[Dict]:
         try:
-            query = f"DESCRIBE TABLE {table_name}"
-            results = self.execute_query(query)
+            results = _fetch_columns(self.config['account'], self.config['user'], self.config.get('role'),
+                                     self.config.get('database'), self.config.get('schema'), table_name, self)
             logger.info(f"Retrieved {len(results)} columns for table {table_name}")
             return results
 
@@ -258,10 +408,113 @@ class SnowflakeConnection:
             logger.error(f"Failed to get columns for {table_name}: {str(e)}")
             return []
 
-    def close(self):
-        if self.connection:
-            self.connection.close()
-            logger.info("Snowflake connection closed")
+
+# Schema metadata rarely changes within a session; the connection itself is left out of the key.
+# The cache is shared by every session, so user and role are part of the key: what is visible depends on them.
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_tables(account: str, user: str, role: Optional[str], database: Optional[str], schema: Optional[str],
+                  _conn: SnowflakeConnection) -> List[str]:
+    return [row['name'] for batch in _conn.execute_query_stream("SHOW TABLES", ['name'])
+            for row in batch]
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_columns(account: str, user: str, role: Optional[str], database: Optional[str],
+                   schema: Optional[str], table_name: str, _conn: SnowflakeConnection) -> List[Dict]:
+    return _conn.execute_query(f"DESCRIBE TABLE {table_name}", ['name', 'type'])
+
+
+# One match per dbt output line, checked in the same PASS > FAIL > WARN > ERROR order
+_TEST_STATUS_RE = re.compile(r'^(?:.*?(PASS)|.*?(FAIL)|.*?(WARN)|.*?(ERROR))', re.MULTILINE)
+_TEST_DETAIL_RE = re.compile(r'^(?=.*test)(?=.*(?:pass|fail)).*', re.MULTILINE | re.IGNORECASE)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _load_run_results(path: str, mtime_ns: int) -> Dict:
+    """Tally dbt test results; mtime_ns keys the cache so a new run is re-read"""
+    raw = Path(path).read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+    tests = [r for r in data.get('results', []) if r.get('unique_id', '').startswith('test.')]
+    counts = Counter(r.get('status') for r in tests)
+
+    coverage = {
+        'total_tests': counts['pass'] + counts['fail'],
+        'passed_tests': counts['pass'],
+        'failed_tests': counts['fail'],
+        'warnings': counts['warn'],
+        'errors': counts['error'],
+        'test_details': [f"{r['unique_id']}: {(r.get('status') or '').upper()} {r.get('message') or ''}".rstrip()
+                         for r in tests]
+    }
+    coverage['pass_rate'] = (coverage['passed_tests'] / coverage['total_tests'] * 100
+                             if coverage['total_tests'] else 0.0)
+
+    logger.info(f"Parsed run_results.json: {coverage['total_tests']} tests, {coverage['passed_tests']} passed")
+    return coverage
+
+
+# Static project config, kept in yaml.dump's output form
+_DBT_PROJECT_YML = """config-version: 2
+model-paths:
+- models
+models:
+  test_generator_project:
+    materialized: view
+name: test_generator_project
+profile: default
+target-path: target
+test-paths:
+- tests
+version: 1.0.0
+"""
+
+_EXECUTION_REPORT_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>DBT Test Execution Report</title>
+    <style>
+        body {{ font-family: 'Inter', sans-serif; max-width: 1200px; margin: 0 auto; padding: 20px; }}
+        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 15px; color: white; }}
+        .metric {{ display: inline-block; padding: 20px; margin: 10px; background: white; border-radius: 10px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); }}
+        .metric-value {{ font-size: 2.5rem; font-weight: bold; color: {status_color}; }}
+        .status {{ background: {status_color}; color: white; padding: 15px; border-radius: 10px; text-align: center; font-size: 1.5rem; margin: 20px 0; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>DBT Test Execution Report</h1>
+        <p>Model: {model_name}</p>
+        <p>Timestamp: {timestamp}</p>
+    </div>
+
+    <div class="status">{status_text} - {pass_rate:.1f}% Pass Rate</div>
+
+    <div style="text-align: center;">
+        <div class="metric">
+            <div class="metric-value">{total_tests}</div>
+            <div>Total Tests</div>
+        </div>
+        <div class="metric">
+            <div class="metric-value" style="color: #4CAF50;">{passed_tests}</div>
+            <div>Passed</div>
+        </div>
+        <div class="metric">
+            <div class="metric-value" style="color: #F44336;">{failed_tests}</div>
+            <div>Failed</div>
+        </div>
+        <div class="metric">
+            <div class="metric-value" style="color: #FF9800;">{warnings}</div>
+            <div>Warnings</div>
+        </div>
+    </div>
+
+    <h3>Test Details:</h3>
+    <pre style="background: #f5f5f5; padding: 15px; border-radius: 8px; overflow-x: auto;">
+{test_details}
+    </pre>
+</body>
+</html>"""
 
 
 class DBTTestExecutor:
@@ -284,33 +537,19 @@ class DBTTestExecutor:
 
             model_file = models_dir / f"{model_name}.sql"
             model_file.write_text(model_sql)
-            logger.debug(f"Created model file: {model_file}")
+            logger.debug("Created model file: %s", model_file)
 
             schema_file = models_dir / "schema.yml"
             schema_file.write_text(schema_yaml)
-            logger.debug(f"Created schema file: {schema_file}")
+            logger.debug("Created schema file: %s", schema_file)
 
             test_file = tests_dir / f"test_{model_name}.sql"
             test_file.write_text(unit_test_sql)
-            logger.debug(f"Created test file: {test_file}")
+            logger.debug("Created test file: %s", test_file)
 
             project_file = self.dbt_project_dir / "dbt_project.yml"
             if not project_file.exists():
-                project_config = {
-                    'name': 'test_generator_project',
-                    'version': '1.0.0',
-                    'config-version': 2,
-                    'profile': 'default',
-                    'model-paths': ['models'],
-                    'test-paths': ['tests'],
-                    'target-path': 'target',
-                    'models': {
-                        'test_generator_project': {
-                            'materialized': 'view'
-                        }
-                    }
-                }
-                project_file.write_text(yaml.dump(project_config))
+                project_file.write_text(_DBT_PROJECT_YML)
                 logger.debug("Created dbt_project.yml")
 
             logger.info("DBT project setup completed successfully")
@@ -324,11 +563,9 @@ class DBTTestExecutor:
         try:
             logger.info(f"Executing DBT command: {command}")
 
-            full_command = f"cd {self.dbt_project_dir} && dbt {command}"
-
             result = subprocess.run(
-                full_command,
-                shell=True,
+                ["dbt", *shlex.split(command)],
+                cwd=self.dbt_project_dir,
                 capture_output=True,
                 text=True,
                 timeout=300
@@ -374,64 +611,55 @@ class DBTTestExecutor:
         results = {
             'model_name': model_name,
             'timestamp': datetime.now().isoformat(),
-            'compile': None,
-            'run': None,
-            'test': None,
+            'build': None,
             'coverage': None
         }
 
-        logger.info("Step 1: Compiling DBT project")
-        results['compile'] = self.run_dbt_command('compile')
-
-        if not results['compile']['success']:
-            logger.error("Compilation failed, skipping remaining steps")
-            return results
-
-        logger.info("Step 2: Running DBT model")
-        results['run'] = self.run_dbt_command(f'run --select {model_name}')
-
-        if not results['run']['success']:
-            logger.error("Model run failed, skipping tests")
-            return results
-
-        logger.info("Step 3: Running DBT tests")
-        results['test'] = self.run_dbt_command(f'test --select {model_name}')
+        # build compiles, runs and tests the model in one dbt invocation (one project parse)
+        logger.info("Building DBT model and running its tests")
+        started_ns = time.time_ns()
+        results['build'] = self.run_dbt_command(f'build --select {model_name}')
 
-        results['coverage'] = self.parse_test_results(results['test']['stdout'])
+        results['coverage'] = self.parse_run_results(started_ns)
+        if results['coverage'] is None:
+            results['coverage'] = self.parse_test_results(results['build']['stdout'])
 
         logger.info(f"Test execution completed. Coverage: {results['coverage']}")
         return results
 
+    def parse_run_results(self, since_ns: int = 0) -> Optional[Dict]:
+        """Coverage from target/run_results.json, or None if this run did not write one"""
+        run_results = self.dbt_project_dir / "target" / "run_results.json"
+        try:
+            mtime_ns = run_results.stat().st_mtime_ns
+        except OSError:
+            return None
+        if mtime_ns < since_ns:
+            logger.warning("Ignoring stale run_results.json")
+            return None
+
+        try:
+            return _load_run_results(str(run_results), mtime_ns)
+        except Exception as e:
+            logger.error(f"Error reading run_results.json: {str(e)}")
+            return None
+
     def parse_test_results(self, test_output: str) -> Dict:
         try:
             logger.debug("Parsing test results")
 
+            # lastindex is the first of PASS/FAIL/WARN/ERROR found on each line
+            counts = Counter(m.lastindex for m in _TEST_STATUS_RE.finditer(test_output))
+
             coverage = {
-                'total_tests': 0,
-                'passed_tests': 0,
-                'failed_tests': 0,
-                'warnings': 0,
-                'errors': 0,
-                'test_details': []
+                'total_tests': counts[1] + counts[2],
+                'passed_tests': counts[1],
+                'failed_tests': counts[2],
+                'warnings': counts[3],
+                'errors': counts[4],
+                'test_details': [m.group().strip() for m in _TEST_DETAIL_RE.finditer(test_output)]
             }
 
-            lines = test_output.split('\n')
-
-            for line in lines:
-                if 'PASS' in line:
-                    coverage['passed_tests'] += 1
-                    coverage['total_tests'] += 1
-                elif 'FAIL' in line:
-                    coverage['failed_tests'] += 1
-                    coverage['total_tests'] += 1
-                elif 'WARN' in line:
-                    coverage['warnings'] += 1
-                elif 'ERROR' in line:
-                    coverage['errors'] += 1
-
-                if 'test' in line.lower() and ('pass' in line.lower() or 'fail' in line.lower()):
-                    coverage['test_details'].append(line.strip())
-
             if coverage['total_tests'] > 0:
                 coverage['pass_rate'] = (coverage['passed_tests'] / coverage['total_tests']) * 100
             else:
@@ -467,54 +695,22 @@ class DBTTestExecutor:
             status_color = '#F44336'
             status_text = 'NEEDS IMPROVEMENT'
 
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>DBT Test Execution Report</title>
-    <style>
-        body {{ font-family: 'Inter', sans-serif; max-width: 1200px; margin: 0 auto; padding: 20px; }}
-        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 15px; color: white; }}
-        .metric {{ display: inline-block; padding: 20px; margin: 10px; background: white; border-radius: 10px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); }}
-        .metric-value {{ font-size: 2.5rem; font-weight: bold; color: {status_color}; }}
-        .status {{ background: {status_color}; color: white; padding: 15px; border-radius: 10px; text-align: center; font-size: 1.5rem; margin: 20px 0; }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>DBT Test Execution Report</h1>
-        <p>Model: {results['model_name']}</p>
-        <p>Timestamp: {results['timestamp']}</p>
-    </div>
-
-    <div class="status">{status_text} - {pass_rate:.1f}% Pass Rate</div>
-
-    <div style="text-align: center;">
-        <div class="metric">
-            <div class="metric-value">{coverage.get('total_tests', 0)}</div>
-            <div>Total Tests</div>
-        </div>
-        <div class="metric">
-            <div class="metric-value" style="color: #4CAF50;">{coverage.get('passed_tests', 0)}</div>
-            <div>Passed</div>
-        </div>
-        <div class="metric">
-            <div class="metric-value" style="color: #F44336;">{coverage.get('failed_tests', 0)}</div>
-            <div>Failed</div>
-        </div>
-        <div class="metric">
-            <div class="metric-value" style="color: #FF9800;">{coverage.get('warnings', 0)}</div>
-            <div>Warnings</div>
-        </div>
-    </div>
+        return _EXECUTION_REPORT_HTML.format(
+            status_color=status_color,
+            status_text=status_text,
+            pass_rate=pass_rate,
+            model_name=results['model_name'],
+            timestamp=results['timestamp'],
+            total_tests=coverage.get('total_tests', 0),
+            passed_tests=coverage.get('passed_tests', 0),
+            failed_tests=coverage.get('failed_tests', 0),
+            warnings=coverage.get('warnings', 0),
+            test_details='\n'.join(coverage.get('test_details', ['No test details available']))
+        )
 
-    <h3>Test Details:</h3>
-    <pre style="background: #f5f5f5; padding: 15px; border-radius: 8px; overflow-x: auto;">
-{chr(10).join(coverage.get('test_details', ['No test details available']))}
-    </pre>
-</body>
-</html>"""
 
-        return html
+_GHERKIN_LINE_RE = re.compile(r'(?:(Feature|Scenario):|(Given|When|Then|And)\b)\s*(.*)')
+_GHERKIN_STEP_SECTIONS = {'Given': 'given', 'When': 'when', 'Then': 'then'}
 
 
 class GherkinDSLParser:
@@ -522,7 +718,6 @@ class GherkinDSLParser:
 
     @staticmethod
     def parse_feature(feature_text: str) -> Dict:
-        lines = feature_text.strip().split('\n')
         feature = {
             'name': '',
             'description': '',
@@ -530,43 +725,56 @@ class GherkinDSLParser:
         }
 
         current_scenario = None
+        section = None
 
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Feature:'):
-                feature['name'] = line.replace('Feature:', '').strip()
-            elif line.startswith('Scenario:'):
-                if current_scenario:
-                    feature['scenarios'].append(current_scenario)
+        for line in feature_text.strip().split('\n'):
+            match = _GHERKIN_LINE_RE.match(line.strip())
+            if not match:
+                continue
+
+            keyword = match.group(1) or match.group(2)
+            text = match.group(3)
+
+            if keyword == 'Feature':
+                feature['name'] = text
+            elif keyword == 'Scenario':
                 current_scenario = {
-                    'name': line.replace('Scenario:', '').strip(),
+                    'name': text,
                     'given': [],
                     'when': [],
                     'then': []
                 }
-            elif line.startswith('Given'):
-                if current_scenario:
-                    current_scenario['given'].append(line.replace('Given', '').strip())
-            elif line.startswith('And') and current_scenario:
-                if current_scenario['then']:
-                    current_scenario['then'].append(line.replace('And', '').strip())
-                elif current_scenario['when']:
-                    current_scenario['when'].append(line.replace('And', '').strip())
-                elif current_scenario['given']:
-                    current_scenario['given'].append(line.replace('And', '').strip())
-            elif line.startswith('When'):
-                if current_scenario:
-                    current_scenario['when'].append(line.replace('When', '').strip())
-            elif line.startswith('Then'):
-                if current_scenario:
-                    current_scenario['then'].append(line.replace('Then', '').strip())
-
-        if current_scenario:
-            feature['scenarios'].append(current_scenario)
+                feature['scenarios'].append(current_scenario)
+                section = None
+            elif current_scenario:
+                # "And" continues the step keyword written last, not the last non-empty list:
+                # Given a / When b / Given c / And d puts d under given
+                section = _GHERKIN_STEP_SECTIONS.get(keyword, section)
+                if section:
+                    current_scenario[section].append(text)
 
         return feature
 
 
+# Whole whitespace-separated words that are identifiers of 3+ characters
+_COLUMN_WORD_RE = re.compile(r'(?<!\S)(?!\d)\w{3,}(?!\S)')
+
+_SCHEMA_COLUMN_TMPL = """      - name: {c}
+        description: "{c} column"
+"""
+
+_NULL_CHECK_TMPL = """
+null_check_{c} as (
+    select
+        'null_check_{c}' as test_name,
+        count(*) as failed_records,
+        '{c} should not be null' as test_description,
+        '{c}' as column_name
+    from source_data
+    where {c} is null
+),"""
+
+
 class DBTTestGenerator:
     """Generate DBT tests from Gherkin specifications"""
 
@@ -581,24 +789,24 @@ class DBTTestGenerator:
                 elif 'not null' in then_clause.lower():
                     tests.append(f"      - not_null")
 
-        schema = f"""version: 2
+        parts = [f"""version: 2
 
 models:
   - name: {model_name}
     description: "Generated from Gherkin feature: {feature['name']}"
     columns:
-"""
+"""]
+
+        column_tests = ""
+        if tests:
+            column_tests = "        tests:\n" + "".join(f"        {test}\n" for test in tests[:2])
 
         columns = DBTTestGenerator._extract_all_columns(feature)
         for col in columns:
-            schema += f"      - name: {col}\n"
-            schema += f"        description: \"{col} column\"\n"
-            if tests:
-                schema += f"        tests:\n"
-                for test in tests[:2]:
-                    schema += f"        {test}\n"
+            parts.append(_SCHEMA_COLUMN_TMPL.format(c=col))
+            parts.append(column_tests)
 
-        return schema
+        return "".join(parts)
 
     @staticmethod
     def generate_comprehensive_unit_test(model_name: str, model_sql: str) -> str:
@@ -607,7 +815,7 @@ models:
         if not columns:
             columns = ['id', 'created_at', 'updated_at', 'status', 'value']
 
-        sql = f"""-- 100% Comprehensive Unit Test Coverage for {model_name}
+        parts = [f"""-- 100% Comprehensive Unit Test Coverage for {model_name}
 -- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 -- Coverage: ALL {len(columns)} columns tested
 
@@ -621,30 +829,20 @@ with source_data as (
 ),
 
 -- NULL CHECKS
-"""
+"""]
 
-        for idx, col in enumerate(columns):
-            sql += f"""
-null_check_{col} as (
-    select
-        'null_check_{col}' as test_name,
-        count(*) as failed_records,
-        '{col} should not be null' as test_description,
-        '{col}' as column_name
-    from source_data
-    where {col} is null
-),"""
+        parts.extend(_NULL_CHECK_TMPL.format(c=col) for col in columns)
 
-        sql += """
+        parts.append("""
 
 -- AGGREGATE ALL TESTS
 all_tests as (
-"""
+""")
 
         test_ctes = [f"null_check_{col}" for col in columns]
-        sql += "    select * from " + "\n    union all\n    select * from ".join(test_ctes)
+        parts.append("    select * from " + "\n    union all\n    select * from ".join(test_ctes))
 
-        sql += f"""
+        parts.append(f"""
 ),
 
 test_summary as (
@@ -687,9 +885,9 @@ select
     end as status
 from test_summary
 where total_failures > 0
-"""
+""")
 
-        return sql
+        return "".join(parts)
 
     @staticmethod
     def generate_unit_test_with_coverage(feature: Dict, model_name: str, model_sql: str) -> Dict[str, str]:
@@ -725,17 +923,28 @@ where total_failures > 0
 
     @staticmethod
     def _extract_all_columns(feature: Dict) -> List[str]:
-        columns = set()
-        for scenario in feature['scenarios']:
-            for clauses in [scenario['given'], scenario['when'], scenario['then']]:
-                for clause in clauses:
-                    words = clause.split()
-                    for word in words:
-                        if word.isidentifier() and len(word) > 2:
-                            columns.add(word.lower())
+        text = ' '.join(clause
+                        for scenario in feature['scenarios']
+                        for clauses in (scenario['given'], scenario['when'], scenario['then'])
+                        for clause in clauses)
+        columns = {word.lower() for word in _COLUMN_WORD_RE.findall(text)}
         return list(columns)[:5]
 
 
+# Each regex matches with lastgroup set to the first alternative that applies, in priority order
+_COLUMN_TYPE_RE = re.compile(r'(?:(?=.*(?:TIMESTAMP|DATE))(?P<temporal>)|(?=.*(?:VARCHAR|STRING))(?P<text>))',
+                             re.IGNORECASE)
+_COLUMN_NAME_RES = {
+    'temporal': re.compile(r'(?=.*(?:created|updated))(?P<audit>)', re.IGNORECASE),
+    'text': re.compile(r'(?:(?=.*email)(?P<email>)|(?=.*name)(?P<name>))', re.IGNORECASE)
+}
+_COLUMN_TRANSFORMS = {
+    'audit': "    {c}::timestamp as {c}",
+    'email': "    lower(trim({c})) as {c}",
+    'name': "    trim({c}) as {c}"
+}
+
+
 class DBTModelGenerator:
     """Generate DBT models from specifications"""
 
@@ -789,7 +998,7 @@ where 1=1
         config_str = ',\n        '.join([f"{k}='{v}'" if isinstance(v, str) else f"{k}={v}"
                                          for k, v in config_options.items()])
 
-        sql = f"""{{{{
+        parts = [f"""{{{{
     config(
         {config_str}
     )
@@ -804,36 +1013,26 @@ where 1=1
 */
 
 select
-"""
+"""]
 
         column_definitions = []
         for col in columns:
             col_name = col.get('name', col.get('COLUMN_NAME', 'unknown'))
-            col_type = col.get('type', col.get('DATA_TYPE', '')).upper()
+            col_type = col.get('type', col.get('DATA_TYPE', ''))
 
-            if 'TIMESTAMP' in col_type or 'DATE' in col_type:
-                if 'created' in col_name.lower() or 'updated' in col_name.lower():
-                    column_definitions.append(f"    {col_name}::timestamp as {col_name}")
-                else:
-                    column_definitions.append(f"    {col_name}")
-            elif 'VARCHAR' in col_type or 'STRING' in col_type:
-                if 'email' in col_name.lower():
-                    column_definitions.append(f"    lower(trim({col_name})) as {col_name}")
-                elif 'name' in col_name.lower():
-                    column_definitions.append(f"    trim({col_name}) as {col_name}")
-                else:
-                    column_definitions.append(f"    {col_name}")
-            else:
-                column_definitions.append(f"    {col_name}")
+            type_match = _COLUMN_TYPE_RE.match(col_type)
+            name_match = type_match and _COLUMN_NAME_RES[type_match.lastgroup].match(col_name)
+            transform = _COLUMN_TRANSFORMS[name_match.lastgroup] if name_match else "    {c}"
+            column_definitions.append(transform.format(c=col_name))
 
-        sql += ",\n".join(column_definitions)
+        parts.append(",\n".join(column_definitions))
 
         if source_database and source_schema:
-            sql += f"\nfrom {{{{ source('{source_schema}', '{table_name}') }}}}"
+            parts.append(f"\nfrom {{{{ source('{source_schema}', '{table_name}') }}}}")
         else:
-            sql += f"\nfrom {{{{ source('raw', '{table_name}') }}}}"
+            parts.append(f"\nfrom {{{{ source('raw', '{table_name}') }}}}")
 
-        sql += "\nwhere 1=1\n"
+        parts.append("\nwhere 1=1\n")
 
         if model_type == 'incremental':
             update_col = None
@@ -844,14 +1043,14 @@ select
                     break
 
             if update_col:
-                sql += f"""
+                parts.append(f"""
         {{% if is_incremental() %}}
             and {update_col} > (select max({update_col}) from {{{{ this }}}})
         {{% endif %}}
-        """
+        """)
 
         logger.info(f"Model generated successfully for {table_name}")
-        return sql
+        return "".join(parts)
 
         @staticmethod
         def generate_from_csv_structure(csv_file_path: str, model_name: str, model_type: str = "view") -> str:
@@ -1200,10 +1399,8 @@ def main():
                                     'role': sf_role if sf_role else None
                                 }
 
-                                conn = SnowflakeConnection(sf_config)
-                                conn.connect()
-                                info = conn.test_connection()
-                                conn.close()
+                                with SnowflakeConnection(sf_config) as conn:
+                                    info = conn.test_connection()
 
                                 st.success("Connected to Snowflake!")
                                 st.json(info)
@@ -1215,6 +1412,14 @@ def main():
                             st.error(f"Connection failed: {str(e)}")
                     else:
                         st.warning("Please fill in all required fields")
+
+            if 'snowflake_config' in st.session_state:
+                if st.button("Refresh Schema", use_container_width=True,
+                             help="Re-read tables and columns from Snowflake"):
+                    _fetch_tables.clear()
+                    _fetch_columns.clear()
+                    st.session_state.pop('available_tables', None)
+                    st.success("Schema cache cleared")
         else:
             st.warning("Snowflake connector not installed")
 
@@ -1304,10 +1509,8 @@ def main():
                     if st.button("Fetch Tables"):
                         try:
                             with st.spinner("Fetching tables from Snowflake..."):
-                                conn = SnowflakeConnection(st.session_state['snowflake_config'])
-                                conn.connect()
-                                tables = conn.get_tables()
-                                conn.close()
+                                with SnowflakeConnection(st.session_state['snowflake_config']) as conn:
+                                    tables = conn.get_tables()
 
                                 st.session_state['available_tables'] = tables
                                 st.success(f"Found {len(tables)} tables")
@@ -1327,10 +1530,8 @@ def main():
                         if st.button("Generate Model", use_container_width=True):
                             try:
                                 with st.spinner("Generating model from table metadata..."):
-                                    conn = SnowflakeConnection(st.session_state['snowflake_config'])
-                                    conn.connect()
-                                    columns = conn.get_table_columns(selected_table)
-                                    conn.close()
+                                    with SnowflakeConnection(st.session_state['snowflake_config']) as conn:
+                                        columns = conn.get_table_columns(selected_table)
 
                                     model_sql = DBTModelGenerator.generate_from_table_metadata(
                                         selected_table,
@@ -1838,7 +2039,7 @@ Scenario: Customer ID uniqueness
                             progress = st.progress(0)
                             status_text = st.empty()
 
-                            status_text.text("Compiling...")
+                            status_text.text("Building model and running tests...")
                             progress.progress(25)
 
                             results = executor.run_tests(
@@ -1862,7 +2063,7 @@ Scenario: Customer ID uniqueness
                         metric_cols[2].metric("Failed", coverage.get('failed_tests', 0))
                         metric_cols[3].metric("Pass Rate", f"{coverage.get('pass_rate', 0):.1f}%")
 
-                        if results['test']['success']:
+                        if results['build']['success']:
                             st.success("All tests executed successfully!")
                         else:
                             st.error("Some tests failed")
@@ -1911,24 +2112,20 @@ Scenario: Customer ID uniqueness
         if st.button("Scan Schema for Tables", use_container_width=True):
             try:
                 with st.spinner(f"Scanning {batch_schema} schema..."):
-                    conn = SnowflakeConnection(st.session_state['snowflake_config'])
-                    conn.connect()
+                    with SnowflakeConnection(st.session_state['snowflake_config']) as conn:
+                        tables = conn.get_tables()
 
-                    tables = conn.get_tables()
-
-                    table_metadata = []
-                    progress_bar = st.progress(0)
-
-                    for idx, table in enumerate(tables):
-                        columns = conn.get_table_columns(table)
-                        table_metadata.append({
-                            'table_name': table,
-                            'columns': columns,
-                            'column_count': len(columns)
-                        })
-                        progress_bar.progress((idx + 1) / len(tables))
+                        table_metadata = []
+                        progress_bar = st.progress(0)
 
-                    conn.close()
+                        for idx, table in enumerate(tables):
+                            columns = conn.get_table_columns(table)
+                            table_metadata.append({
+                                'table_name': table,
+                                'columns': columns,
+                                'column_count': len(columns)
+                            })
+                            progress_bar.progress((idx + 1) / len(tables))
 
                     st.session_state['batch_table_metadata'] = table_metadata
                     st.success(f"Found {len(tables)} tables with metadata")